@@ -0,0 +1,188 @@
+import argparse
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from monte_carlo import _discount, _final_capital
+
+# Bundled yearly history, data/historical.csv is the source and
+# data/historical.npy the memory-mapped copy read at run time
+DATA_DIR = Path(__file__).with_name("data")
+HISTORY_CSV = DATA_DIR / "historical.csv"
+HISTORY_PATH = DATA_DIR / "historical.npy"
+
+# Series of the bundled history (in percentage): the S&P 500 total return,
+# the US CPI (December to December) and the Polish CPI (yearly average)
+RETURN_SERIES = ("sp500",)
+INFLATION_SERIES = ("us_cpi", "pl_cpi")
+
+
+class BacktestResult:
+    """
+    Outcome of backtest_retirement.
+
+    Attributes:
+        retirement_ages: candidate retirement ages, current_age .. death_age - 1
+        success_rate: share of historical windows with capital left at death, per age
+        worst_depletion_age: earliest age at which the capital ran out in any
+            window, per retirement age, NaN if it never ran out
+        worst_start_year: first year of the window with that depletion, per
+            retirement age, 0 if the capital never ran out
+        start_years: first year of every window
+    """
+
+    __slots__ = (
+        "retirement_ages",
+        "success_rate",
+        "worst_depletion_age",
+        "worst_start_year",
+        "start_years",
+    )
+
+    def __init__(
+        self, retirement_ages, success_rate, worst_depletion_age, worst_start_year, start_years
+    ):
+        self.retirement_ages = retirement_ages
+        self.success_rate = success_rate
+        self.worst_depletion_age = worst_depletion_age
+        self.worst_start_year = worst_start_year
+        self.start_years = start_years
+
+    def retirement_age(self, confidence=1.0):
+        """
+        Earliest retirement age that succeeds in at least `confidence` of the
+        historical windows, or None.
+        """
+        (ages,) = np.nonzero(self.success_rate >= confidence)
+        return int(self.retirement_ages[ages[0]]) if len(ages) else None
+
+
+@lru_cache(maxsize=None)
+def load_history(path=HISTORY_PATH):
+    """
+    Memory-maps a history saved by build_history, a structured array with a
+    year field and one field per series.
+    """
+    return np.load(path, mmap_mode="r")
+
+
+def build_history(csv_path=HISTORY_CSV, path=HISTORY_PATH):
+    """
+    Converts a CSV with a year column and one column per series into the
+    .npy file read by load_history.
+    """
+    table = np.genfromtxt(csv_path, delimiter=",", names=True)
+    dtype = [("year", np.int16)] + [
+        (name, np.float64) for name in table.dtype.names if name != "year"
+    ]
+    history = np.empty(len(table), dtype=dtype)
+    for name in history.dtype.names:
+        history[name] = table[name]
+    np.save(path, history)
+    load_history.cache_clear()
+
+
+def backtest_retirement(
+    current_age,
+    monthly_contribution,
+    death_age,
+    retirement_value,
+    starting_capital,
+    returns="sp500",
+    inflation="us_cpi",
+    wrap=True,
+    history=None,
+):
+    """
+    Runs the retirement plan over every historical starting year: year t of
+    the plan gets the return and inflation of year start + t of the history.
+
+    All windows are strided views of the same series and are evaluated
+    together, every candidate retirement age on every window at once.
+
+    Args:
+        current_age, monthly_contribution, death_age, retirement_value,
+            starting_capital: as in calculate_retirement_age, the return and
+            inflation come from the history
+        returns: one of RETURN_SERIES
+        inflation: one of INFLATION_SERIES
+        wrap: continue windows that run past the last year from the first
+            year, so every year starts a window and plans may be longer than
+            the history. Otherwise only complete windows are used
+        history: structured array as returned by load_history, defaults to
+            the bundled history
+
+    Returns:
+        BacktestResult
+    """
+    if history is None:
+        history = load_history()
+    for name, series in ((returns, RETURN_SERIES), (inflation, INFLATION_SERIES)):
+        if name not in history.dtype.names or name == "year":
+            raise ValueError(f"Unknown series {name!r}, expected one of {series}")
+    if retirement_value < 0:
+        raise ValueError("retirement_value must not be negative")
+
+    years = max(death_age - current_age, 0)
+    growth = _windows(1 + np.asarray(history[returns]) / 100, years, wrap)
+    indexation = _windows(1 + np.asarray(history[inflation]) / 100, years, wrap)
+    start_years = np.asarray(history["year"])[: len(growth)]
+
+    contribution, withdrawal = monthly_contribution * 12, retirement_value * 12
+    cumulative_growth, flows = _discount(growth, indexation)
+    final_capital = _final_capital(
+        cumulative_growth, flows, contribution, withdrawal, starting_capital
+    )
+
+    # Year t (1-based) of every window and candidate in which the capital runs
+    # out: the first year after retirement whose withdrawals exceed the funds
+    funded = starting_capital + (contribution + withdrawal) * flows[:, :years]
+    year = np.arange(1, years + 1)
+    depleted = (withdrawal * flows[:, None, 1:] > funded[:, :, None]) & (
+        year > np.arange(years)[:, None]
+    )
+    depletion_year = np.where(depleted.any(axis=2), np.argmax(depleted, axis=2) + 1, years + 1)
+
+    worst_window = np.argmin(depletion_year, axis=0)
+    worst_year = depletion_year[worst_window, np.arange(years)]
+    ran_out = worst_year <= years
+    return BacktestResult(
+        np.arange(current_age, current_age + years),
+        (final_capital > 0).mean(axis=0) if len(growth) else np.zeros(years),
+        np.where(ran_out, current_age + worst_year - 1, np.nan),
+        np.where(ran_out, start_years[worst_window], 0),
+        start_years,
+    )
+
+
+def _windows(series, years, wrap):
+    """
+    Strided (windows, years) view of series with one window per start year.
+    """
+    if wrap:
+        # Repeat the start of the series so that every year starts a full window
+        repeats = -(-(len(series) + years - 1) // max(len(series), 1))
+        series = np.tile(series, repeats)[: len(series) + years - 1]
+    elif years > len(series):
+        raise ValueError(
+            f"The history covers {len(series)} years, the plan needs {years}, use wrap=True"
+        )
+    if years == 0:
+        return np.empty((len(series), 0))
+    return sliding_window_view(series, years)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the memory-mapped history")
+    parser.add_argument("csv", nargs="?", default=HISTORY_CSV)
+    parser.add_argument("path", nargs="?", default=HISTORY_PATH)
+    args = parser.parse_args()
+    build_history(args.csv, args.path)
+    history = load_history(args.path)
+    print(f"{args.path}: {len(history)} years, {history['year'][0]}-{history['year'][-1]}")
+
+
+if __name__ == "__main__":
+    main()
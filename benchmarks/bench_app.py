@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Interactions of one session, in order, as (name, widget label, value).
+# Values are what the browser sends: the displayed option of a selectbox,
+# True for a button click. Interactions whose widget the page doesn't show
+# are skipped, so the same list works for older versions of the app.
+INTERACTIONS = (
+    ("load", None, None),
+    ("calculate", "🚀 OBLICZ EMERYTURĘ", True),
+    ("sidebar_return", "📈 Średnia stopa zwrotu (%)", 7.0),
+    ("recalculate", "🚀 OBLICZ EMERYTURĘ", True),
+    ("history_inflation", "🏦 Inflacja historyczna", "🇵🇱 Inflacja w Polsce"),
+    ("sensitivity_size", "🔢 Rozdzielczość mapy", 30),
+    ("scenario_table", "📋 Pokaż tabelę scenariuszy", True),
+    ("target_age", "🏁 Docelowy wiek emerytury", 45),
+    ("save_scenario", "💾 Zapisz scenariusz", True),
+    ("compare_return", "📈 Średnia stopa zwrotu (%)", 6.0),
+    ("compare_calculate", "🚀 OBLICZ EMERYTURĘ", True),
+    ("save_second_scenario", "💾 Zapisz scenariusz", True),
+    ("live_mode", "⚡ Obliczenia na żywo", True),
+    ("live_return", "📈 Średnia stopa zwrotu (%)", 8.0),
+    ("live_expenses", "🛒 Miesięczne wydatki (PLN)", 10000),
+)
+
+# Widget element type to the field of its WidgetState
+VALUE_FIELDS = {
+    "button": "trigger_value",
+    "checkbox": "bool_value",
+    "number_input": "double_value",
+    "selectbox": "string_value",
+    "slider": "double_array_value",
+}
+
+
+class Session:
+    """
+    One browser session speaking the Streamlit websocket protocol: it keeps
+    the widget states and the hashes of cacheable messages like the
+    frontend does, so reruns receive cached elements as references.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.widgets = {}  # label -> (element type, widget id, fragment id)
+        self.states = {}  # widget id -> (field, value), sent with every rerun
+        self.cached_hashes = set()
+
+    async def rerun(self, label=None, value=None):
+        """
+        Sets the widget with label to value and waits for the rerun.
+
+        Returns:
+            dict with the milliseconds until the script finished, the bytes
+            and messages received and how many were cached references,
+            or None if the page shows no such widget
+        """
+        fragment_id = ""
+        trigger = None
+        if label is not None:
+            if label not in self.widgets:
+                return None
+            element_type, widget_id, fragment_id = self.widgets[label]
+            field = VALUE_FIELDS[element_type]
+            if field == "trigger_value":
+                trigger = widget_id
+            else:
+                self.states[widget_id] = (field, [value] if field == "double_array_value" else value)
+
+        message = BackMsg()
+        client_state = message.rerun_script
+        client_state.fragment_id = fragment_id
+        client_state.cached_message_hashes.extend(sorted(self.cached_hashes))
+        for widget_id, (field, widget_value) in self.states.items():
+            _set_widget(client_state.widget_states.widgets.add(), widget_id, field, widget_value)
+        if trigger is not None:
+            _set_widget(client_state.widget_states.widgets.add(), trigger, "trigger_value", True)
+
+        started = time.perf_counter()
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        received = messages = references = 0
+        while True:
+            data = await self.connection.read_message()
+            if data is None:
+                raise ConnectionError("The server closed the websocket")
+            received += len(data)
+            messages += 1
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof("type")
+            if kind == "ref_hash":
+                references += 1
+            elif forward.metadata.cacheable:
+                self.cached_hashes.add(forward.hash)
+            if kind == "delta":
+                self._register(forward.delta)
+            elif kind == "script_finished":
+                break
+        return {
+            "ms": (time.perf_counter() - started) * 1000,
+            "bytes": received,
+            "messages": messages,
+            "references": references,
+        }
+
+    def _register(self, delta):
+        if not delta.HasField("new_element"):
+            return
+        element = delta.new_element
+        element_type = element.WhichOneof("type")
+        if element_type in VALUE_FIELDS:
+            widget = getattr(element, element_type)
+            self.widgets[widget.label] = (element_type, widget.id, delta.fragment_id)
+
+
+def _set_widget(state, widget_id, field, value):
+    state.id = widget_id
+    if field == "double_array_value":
+        state.double_array_value.data.extend(value)
+    else:
+        setattr(state, field, value)
+
+
+async def run_sessions(url, sessions):
+    """
+    Plays INTERACTIONS in sessions fresh sessions.
+
+    Returns:
+        dict of interaction name to the list of its measurements
+    """
+    results = {}
+    for _ in range(sessions):
+        connection = await websocket_connect(url, subprotocols=["streamlit"])
+        try:
+            session = Session(connection)
+            for name, label, value in INTERACTIONS:
+                measurement = await session.rerun(label, value)
+                if measurement is not None:
+                    results.setdefault(name, []).append(measurement)
+        finally:
+            connection.close()
+    return results
+
+
+def start_server(script, port):
+    """
+    Starts `streamlit run script` in the script's directory, so that its
+    .streamlit/config.toml applies, and waits until it is healthy.
+    """
+    script = Path(script).resolve()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", script.name,
+            "--server.headless", "true",
+            "--server.port", str(port),
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=script.parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"streamlit did not start for {script}")
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Latency and payload of every interaction with the Streamlit app"
+    )
+    parser.add_argument("script", nargs="?", default=str(ROOT / "app.py"),
+                        help="app to start, ignored with --url")
+    parser.add_argument("--url", help="websocket of a running app, e.g. ws://127.0.0.1:8501/_stcore/stream")
+    parser.add_argument("--sessions", type=int, default=5, help="sessions to play, medians are printed")
+    args = parser.parse_args(argv)
+
+    process = None
+    url = args.url
+    if url is None:
+        port = _free_port()
+        process = start_server(args.script, port)
+        url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    try:
+        results = asyncio.run(run_sessions(url, args.sessions))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"{'interaction':<20} {'ms':>10} {'bytes':>10} {'messages':>10} {'cached':>8}")
+    for name, _, _ in INTERACTIONS:
+        if name not in results:
+            print(f"{name:<20} {'n/a':>10}")
+            continue
+        runs = results[name]
+        print(
+            f"{name:<20} "
+            f"{statistics.median(run['ms'] for run in runs):>10,.1f} "
+            f"{statistics.median(run['bytes'] for run in runs):>10,.0f} "
+            f"{statistics.median(run['messages'] for run in runs):>10,.0f} "
+            f"{statistics.median(run['references'] for run in runs):>8,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
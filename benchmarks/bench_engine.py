@@ -0,0 +1,433 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from charts import build_chart_frames  # noqa: E402
+from profiling import LIVE_BUDGET_MS  # noqa: E402
+from retirement_calc import (  # noqa: E402
+    ENGINES,
+    NO_RETIREMENT,
+    SEARCHES,
+    calculate_retirement_age,
+    calculate_retirement_age_batch,
+    find_retirement_age,
+    plan_retirement,
+)
+
+# (current_age, death_age) of the timed horizons
+HORIZONS = {
+    "short": (60, 70),
+    "typical": (30, 90),
+    "extreme": (0, 120),
+}
+
+# Inputs besides the horizon: a plan that retires part-way through and one
+# that never can, which has to try every candidate age
+PROFILES = {
+    "feasible": dict(
+        monthly_contribution=5000,
+        annual_investment_return=6,
+        inflation=3,
+        retirement_value=12000,
+        starting_capital=300000,
+    ),
+    "infeasible": dict(
+        monthly_contribution=0,
+        annual_investment_return=2,
+        inflation=3,
+        retirement_value=12000,
+        starting_capital=0,
+    ),
+}
+
+# Profiles per call of the batch benchmarks
+BATCH_SIZE = 10_000
+
+# Random profiles compared by --check-engines, the month-by-month reference
+# of the monthly engine is slow and gets a tenth of them
+CHECK_SAMPLES = 2000
+
+
+def benchmarks():
+    """
+    Every benchmark as (name, operations per call, function).
+    """
+    cases = []
+    for horizon, (current_age, death_age) in HORIZONS.items():
+        for profile, values in PROFILES.items():
+            inputs = dict(values, current_age=current_age, death_age=death_age)
+            for engine in ENGINES:
+                cases.append((
+                    f"calculate_retirement_age[{engine},{horizon},{profile}]",
+                    1,
+                    lambda inputs=inputs, engine=engine: calculate_retirement_age(**inputs, engine=engine),
+                ))
+                cases.append((
+                    f"plan_retirement[{engine},{horizon},{profile}]",
+                    1,
+                    lambda inputs=inputs, engine=engine: plan_retirement(**inputs, engine=engine).timeline,
+                ))
+                cases.append((
+                    f"find_retirement_age[{engine},{horizon},{profile}]",
+                    1,
+                    lambda inputs=inputs, engine=engine: find_retirement_age(**inputs, engine=engine),
+                ))
+
+    rng = np.random.default_rng(0)
+    for horizon, (current_age, death_age) in HORIZONS.items():
+        batch = dict(
+            current_age=np.full(BATCH_SIZE, current_age),
+            monthly_contribution=rng.uniform(0, 10000, BATCH_SIZE),
+            annual_investment_return=rng.uniform(0, 10, BATCH_SIZE),
+            death_age=np.full(BATCH_SIZE, death_age),
+            inflation=rng.uniform(0, 6, BATCH_SIZE),
+            retirement_value=rng.uniform(1000, 20000, BATCH_SIZE),
+            starting_capital=rng.uniform(0, 1e6, BATCH_SIZE),
+        )
+        cases.append((
+            f"calculate_retirement_age_batch[{horizon}]",
+            BATCH_SIZE,
+            lambda batch=batch: calculate_retirement_age_batch(**batch),
+        ))
+        cases.append((
+            f"calculate_retirement_age_batch[{horizon},timelines]",
+            BATCH_SIZE,
+            lambda batch=batch: calculate_retirement_age_batch(**batch, timelines=True),
+        ))
+    return cases
+
+
+def measure(function, operations, min_time=0.2, repeats=5):
+    """
+    Times function like timeit: the number of calls per repeat is grown until
+    a repeat takes min_time, and the fastest repeat counts. Peak memory is
+    taken from one more call under tracemalloc, which would skew the timing.
+
+    Returns:
+        dict with ops_per_second and peak_memory_bytes
+    """
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        calls *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    best = elapsed
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"ops_per_second": calls * operations / best, "peak_memory_bytes": peak}
+
+
+def check_budget(budget_ms=LIVE_BUDGET_MS, repeats=20):
+    """
+    Times what live mode of the apps computes on a cache miss, plan_retirement
+    and its chart frames, at the longest horizon for every engine and profile.
+
+    Returns:
+        list of (name, median milliseconds, within budget)
+    """
+    current_age, death_age = HORIZONS["extreme"]
+    checks = []
+    for profile, values in PROFILES.items():
+        inputs = dict(values, current_age=current_age, death_age=death_age)
+        for engine in ENGINES:
+            durations = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                build_chart_frames(plan_retirement(**inputs, engine=engine))
+                durations.append((time.perf_counter() - started) * 1000)
+            median = float(np.median(durations))
+            checks.append((f"live[{engine},extreme,{profile}]", median, median < budget_ms))
+    return checks
+
+
+def random_profiles(samples, seed=0):
+    """
+    Random inputs of calculate_retirement_age, including no contributions,
+    equal return and inflation, negative rates and starting debts.
+
+    Returns:
+        list of dicts keyed by argument name
+    """
+    rng = np.random.default_rng(seed)
+    profiles = []
+    for _ in range(samples):
+        current_age = int(rng.integers(0, 80))
+        inflation = round(float(rng.uniform(-2, 10)), 1)
+        profiles.append(dict(
+            current_age=current_age,
+            monthly_contribution=float(rng.choice([0, rng.uniform(0, 10000)])),
+            annual_investment_return=float(rng.choice([inflation, rng.uniform(-5, 15)])),
+            death_age=int(rng.integers(current_age + 1, 121)),
+            inflation=inflation,
+            retirement_value=float(rng.uniform(0, 30000)),
+            starting_capital=float(rng.choice([0, rng.uniform(0, 2e6), rng.uniform(-5e5, 0)])),
+        ))
+    return profiles
+
+
+def monthly_reference(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+):
+    """
+    Month-by-month simulation of the monthly engine's model, one candidate
+    age after the other.
+
+    Returns:
+        retirement_age, capital_after_retirement, chart: as in
+        calculate_retirement_age, None, None, None if impossible
+    """
+    growth = (1 + annual_investment_return / 100) ** (1 / 12)
+    indexation = (1 + inflation / 100) ** (1 / 12)
+    months = (death_age - current_age) * 12
+    chart = []
+    for retirement_age in range(current_age, death_age):
+        retired_from = (retirement_age - current_age) * 12
+        capital, depletion_age = starting_capital, None
+        for month in range(months):
+            flow = -retirement_value if month >= retired_from else monthly_contribution
+            capital = capital * growth + flow * indexation**month
+            if month >= retired_from and capital < 0 and depletion_age is None:
+                depletion_age = current_age + month // 12
+        if capital > 0:
+            return retirement_age, capital, chart
+        if depletion_age is not None:
+            chart.append((retirement_age, depletion_age))
+    return None, None, None
+
+
+def check_engines(samples=CHECK_SAMPLES, seed=0, rtol=1e-9):
+    """
+    Compares every fast path with its reference on random_profiles: the
+    closed-form engine, find_retirement_age and the batch engine with the
+    loop engine, the monthly engine with monthly_reference, and the chart
+    frames with the timeline they are sliced from.
+
+    Ages and charts must be equal, capital may differ by rtol of the
+    largest amount that flows through the plan. A plan whose capital at
+    death is within that tolerance of zero may retire a year apart.
+
+    Returns:
+        list of (name, profiles compared, mismatching profiles)
+    """
+    profiles = random_profiles(samples, seed)
+    references = [plan_retirement(**profile, engine="loop") for profile in profiles]
+    mismatches = {}
+
+    def record(name, profile, matches):
+        mismatches.setdefault(name, [0, []])
+        mismatches[name][0] += 1
+        if not matches:
+            mismatches[name][1].append(profile)
+
+    for profile, reference in zip(profiles, references):
+        scale = _amount_scale(**profile) * rtol
+        age, capital = reference.retirement_age, reference.capital_after_retirement
+        borderline = age is not None and abs(capital) <= scale
+
+        result = plan_retirement(**profile, engine="closed_form")
+        matches = result.retirement_age == age and (age is None or (
+            abs(result.capital_after_retirement - capital) <= scale
+            and result.chart == reference.chart
+            and _timelines_match(result.timeline, reference.timeline, scale)
+        ))
+        record("plan_retirement[closed_form]", profile, matches or borderline)
+
+        for engine in ("loop", "closed_form"):
+            for search in SEARCHES:
+                found_age, found_capital = find_retirement_age(**profile, engine=engine, search=search)
+                matches = found_age == age and (age is None or abs(found_capital - capital) <= scale)
+                record(f"find_retirement_age[{engine},{search}]", profile, matches or borderline)
+
+        if age is not None:
+            frames = build_chart_frames(reference)
+            timeline = reference.timeline
+            phases = frames["capital"].to_numpy()
+            matches = (
+                np.array_equal(frames["capital"].index, timeline.age)
+                and np.array_equal(np.isnan(phases[:, 1]), np.arange(len(timeline)) < timeline.retirement_index)
+                and np.array_equal(np.fmax(phases[:, 0], phases[:, 1]), timeline.capital)
+                and np.array_equal(np.fmax(*frames["cost"].to_numpy().T), timeline.monthly_cost)
+            )
+            record("build_chart_frames", profile, matches)
+
+    columns = {name: np.array([profile[name] for profile in profiles]) for name in profiles[0]}
+    ages, capitals, capital_rows, cost_rows = calculate_retirement_age_batch(**columns, timelines=True)
+    for row, (profile, reference) in enumerate(zip(profiles, references)):
+        scale = _amount_scale(**profile) * rtol
+        age = reference.retirement_age
+        borderline = age is not None and abs(reference.capital_after_retirement) <= scale
+        if age is None:
+            matches = ages[row] == NO_RETIREMENT
+        else:
+            years = len(reference.timeline)
+            matches = (
+                ages[row] == age
+                and abs(capitals[row] - reference.capital_after_retirement) <= scale
+                and np.allclose(capital_rows[row, :years], reference.timeline.capital, rtol=0, atol=scale)
+                and np.allclose(cost_rows[row, :years], reference.timeline.monthly_cost, rtol=0, atol=scale)
+            )
+        record("calculate_retirement_age_batch", profile, matches or borderline)
+
+    for profile in profiles[: max(samples // 10, 1)]:
+        scale = _amount_scale(**profile) * rtol
+        age, capital, chart = monthly_reference(**profile)
+        result = plan_retirement(**profile, engine="monthly")
+        matches = result.retirement_age == age and (age is None or (
+            abs(result.capital_after_retirement - capital) <= scale and result.chart == chart
+        ))
+        record("plan_retirement[monthly]", profile, matches or (age is not None and abs(capital) <= scale))
+
+    return [(name, compared, failed) for name, (compared, failed) in mismatches.items()]
+
+
+def _amount_scale(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+):
+    # Largest amount a plan can reach, the unit of the capital tolerance
+    years = death_age - current_age
+    factor = max(1 + annual_investment_return / 100, 1 + inflation / 100, 1) ** years
+    return (abs(starting_capital) + 12 * (monthly_contribution + retirement_value) * years) * factor
+
+
+def _timelines_match(timeline, reference, atol):
+    return (
+        timeline.retirement_index == reference.retirement_index
+        and np.array_equal(timeline.age, reference.age)
+        and np.allclose(timeline.capital, reference.capital, rtol=0, atol=atol)
+        and np.allclose(timeline.monthly_cost, reference.monthly_cost, rtol=0, atol=atol)
+    )
+
+
+def compare(results, baseline, max_slowdown, max_memory_growth):
+    """
+    Benchmarks of results that regressed against baseline.
+
+    Returns:
+        list of messages, empty if nothing regressed
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        ratio = result["ops_per_second"] / previous["ops_per_second"]
+        if ratio < 1 - max_slowdown:
+            regressions.append(
+                f"{name}: {result['ops_per_second']:,.0f} ops/s, "
+                f"{1 - ratio:.0%} slower than {previous['ops_per_second']:,.0f}"
+            )
+        growth = result["peak_memory_bytes"] / max(previous["peak_memory_bytes"], 1)
+        if growth > 1 + max_memory_growth:
+            regressions.append(
+                f"{name}: {result['peak_memory_bytes']:,} B peak memory, "
+                f"{growth - 1:.0%} more than {previous['peak_memory_bytes']:,}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the retirement engines")
+    parser.add_argument("-k", dest="pattern", default="", help="only benchmarks containing this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--save", type=Path, help="write the results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="JSON baseline to compare with")
+    parser.add_argument("--max-slowdown", type=float, default=0.2,
+                        help="accepted drop of ops/s against the baseline, 0.2 is 20%%")
+    parser.add_argument("--max-memory-growth", type=float, default=0.2,
+                        help="accepted growth of peak memory against the baseline")
+    parser.add_argument("--check-budget", action="store_true",
+                        help=f"only check that live mode computes within {LIVE_BUDGET_MS} ms at age 0 to 120")
+    parser.add_argument("--check-engines", action="store_true",
+                        help=f"only compare the fast engines with their references on {CHECK_SAMPLES} random profiles")
+    args = parser.parse_args(argv)
+
+    if args.check_engines:
+        checks = check_engines()
+        for name, compared, failed in checks:
+            print(f"{name:<60} {compared:>6} profiles {'ok' if not failed else f'{len(failed)} MISMATCHES'}")
+            for profile in failed[:3]:
+                print(f"    {profile}")
+        if any(failed for _, _, failed in checks):
+            sys.exit(1)
+        return
+
+    if args.check_budget:
+        checks = check_budget()
+        for name, median, passed in checks:
+            print(f"{name:<60} {median:>10,.2f} ms {'ok' if passed else 'OVER BUDGET'}")
+        if not all(passed for _, _, passed in checks):
+            sys.exit(1)
+        return
+
+    results = {}
+    for name, operations, function in benchmarks():
+        if args.pattern not in name:
+            continue
+        results[name] = measure(function, operations, args.min_time, args.repeats)
+        print(
+            f"{name:<60} {results[name]['ops_per_second']:>14,.0f} ops/s "
+            f"{results[name]['peak_memory_bytes'] / 1024:>10,.0f} KiB"
+        )
+
+    if args.save:
+        args.save.write_text(json.dumps({
+            "machine": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }, indent=2))
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(
+            results, baseline["results"], args.max_slowdown, args.max_memory_growth
+        )
+        if baseline.get("machine", {}).get("platform") != platform.platform():
+            print(f"warning: {args.compare} was recorded on {baseline['machine']['platform']}")
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
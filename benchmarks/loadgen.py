@@ -0,0 +1,118 @@
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+def random_profile(rng):
+    """
+    Random profile within the limits of the sidebar widgets.
+    """
+    current_age = rng.randint(20, 60)
+    return {
+        "current_age": current_age,
+        "monthly_contribution": rng.randrange(0, 20000, 100),
+        "annual_investment_return": round(rng.uniform(0, 12), 1),
+        "death_age": rng.randint(max(current_age + 1, 50), 120),
+        "inflation": round(rng.uniform(0, 8), 1),
+        "retirement_value": rng.randrange(1000, 30000, 100),
+        "starting_capital": rng.randrange(0, 2_000_000, 1000),
+    }
+
+
+def run(url, requests, concurrency, distinct, batch, seed=0):
+    """
+    Sends `requests` POST requests from `concurrency` threads, each over its
+    own keep-alive connection.
+
+    Args:
+        url: base URL of server.py
+        distinct: number of different profiles sent, fewer means more cache hits
+        batch: profiles per request, 1 uses /retirement and more /retirement/batch
+
+    Returns:
+        dict with the throughput, latency percentiles and error count
+    """
+    rng = random.Random(seed)
+    profiles = [random_profile(rng) for _ in range(distinct)]
+    target = urlsplit(url)
+    path = "/retirement" if batch == 1 else "/retirement/batch"
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker(worker_seed):
+        worker_rng = random.Random(worker_seed)
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80)
+        local_latencies, local_errors = [], 0
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            if batch == 1:
+                payload = worker_rng.choice(profiles)
+            else:
+                payload = {"profiles": worker_rng.choices(profiles, k=batch)}
+            body = json.dumps(payload)
+            started = time.perf_counter()
+            try:
+                connection.request("POST", path, body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port or 80)
+            local_latencies.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(seed + i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, (50, 95, 99)) if len(latencies) else (0, 0, 0)
+    return {
+        "requests": len(latencies),
+        "profiles": len(latencies) * batch,
+        "errors": sum(errors),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "profiles_per_second": round(len(latencies) * batch / elapsed, 1),
+        "latency_ms": {"p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--distinct", type=int, default=100_000,
+                        help="different profiles sent, lower it to measure cache hits")
+    parser.add_argument("--batch", type=int, default=1, help="profiles per request")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(
+        run(args.url, args.requests, args.concurrency, args.distinct, args.batch, args.seed),
+        indent=2,
+    ))
+
+
+if __name__ == "__main__":
+    main()
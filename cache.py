@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+
+import numpy as np
+
+from backtest import backtest_retirement
+from charts import build_chart_frames, build_fan_frame, build_sensitivity_frame
+from disk_cache import DiskCache
+from monte_carlo import simulate_retirement
+from retirement_calc import DEFAULT_ENGINE, plan_retirement
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a time-to-live, shared by all sessions of a
+    Streamlit process.
+
+    Args:
+        max_size: number of entries kept, the least recently used is evicted
+        ttl: seconds after which an entry is computed again
+    """
+
+    def __init__(self, max_size=256, ttl=3600, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value of key, calling compute() on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Computed outside the lock, concurrent misses of one key may compute twice
+        value = compute()
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
+
+
+# Process-wide cache of the Streamlit apps
+RESULT_CACHE = ResultCache(
+    max_size=int(os.environ.get("EMERYTURA_CACHE_SIZE", 256)),
+    ttl=float(os.environ.get("EMERYTURA_CACHE_TTL", 3600)),
+)
+
+# Optional second level shared by all worker processes, e.g.
+# EMERYTURA_DISK_CACHE=/var/cache/emerytura.sqlite
+DISK_CACHE = (
+    DiskCache(
+        os.environ["EMERYTURA_DISK_CACHE"],
+        max_bytes=int(os.environ.get("EMERYTURA_DISK_CACHE_BYTES", 64 * 1024 * 1024)),
+    )
+    if os.environ.get("EMERYTURA_DISK_CACHE")
+    else None
+)
+
+
+def normalize_inputs(*inputs):
+    """
+    Turns widget values into a hashable key, so that e.g. 6 and 6.0 or
+    float noise from number inputs share one entry.
+    """
+    return tuple(
+        value if isinstance(value, (str, bool)) or value is None
+        else int(value) if float(value).is_integer() else round(float(value), 6)
+        for value in inputs
+    )
+
+
+def cached_retirement(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    engine=None,
+    timer=None,
+):
+    """
+    plan_retirement and its chart frames, cached on the normalized inputs
+    and the engine. On a miss the optional profiling.StageTimer times the
+    "engine" and "frames" stages.
+
+    Returns:
+        result, frames: RetirementResult and build_chart_frames(result)
+    """
+    inputs = normalize_inputs(
+        current_age,
+        monthly_contribution,
+        annual_investment_return,
+        death_age,
+        inflation,
+        retirement_value,
+        starting_capital,
+    )
+    engine = engine or DEFAULT_ENGINE
+    stage = timer.stage if timer else lambda name: nullcontext()
+
+    def compute():
+        with stage("engine"):
+            result = DISK_CACHE.get(inputs, engine) if DISK_CACHE else None
+            if result is None:
+                result = plan_retirement(*inputs, engine=engine)
+                if DISK_CACHE:
+                    DISK_CACHE.put(inputs, engine, result)
+        with stage("frames"):
+            frames = build_chart_frames(result)
+        return result, frames
+
+    return RESULT_CACHE.get_or_compute(("retirement", engine) + inputs, compute)
+
+
+def cached_simulation(*inputs, **options):
+    """
+    simulate_retirement cached on the normalized inputs and options, without
+    its capital paths. RESULT_CACHE is limited by entries, not bytes, and
+    the paths of a single simulation take up to about 200 MB.
+    """
+    return RESULT_CACHE.get_or_compute(
+        _simulation_key(inputs, options), lambda: simulate_retirement(*inputs, **options).without_paths()
+    )
+
+
+def cached_fan(retirement_age, *inputs, **options):
+    """
+    build_fan_frame of the capital paths of simulate_retirement(*inputs,
+    **options) when retiring at retirement_age. Only the percentile bands
+    are cached, never the paths.
+
+    A miss simulates with the paths and also fills the cached_simulation
+    entry from the same run, so calling this first saves a simulation.
+    """
+    key = ("fan", retirement_age) + _simulation_key(inputs, options)[1:]
+
+    def compute():
+        simulation = simulate_retirement(*inputs, **options)
+        RESULT_CACHE.get_or_compute(_simulation_key(inputs, options), simulation.without_paths)
+        # Capital at the end of every simulated year
+        return build_fan_frame(
+            simulation.retirement_ages + 1, simulation.capital_percentiles(retirement_age)
+        )
+
+    return RESULT_CACHE.get_or_compute(key, compute)
+
+
+def _simulation_key(inputs, options):
+    names = sorted(options)
+    return ("simulation",) + normalize_inputs(*inputs, *names, *(options[name] for name in names))
+
+
+def cached_sensitivity(*inputs, return_span, contribution_span, size):
+    """
+    build_sensitivity_frame over a size x size grid centred on the inputs'
+    return and contribution, cached on the normalized inputs.
+
+    Args:
+        inputs: inputs of calculate_retirement_age
+        return_span: percentage points below and above the return
+        contribution_span: percent of the contribution below and above it
+        size: number of returns and of contributions
+    """
+    inputs = normalize_inputs(*inputs)
+    key = ("sensitivity",) + inputs + normalize_inputs(return_span, contribution_span, size)
+
+    def compute():
+        annual_investment_return, monthly_contribution = inputs[2], inputs[1]
+        returns = np.linspace(
+            max(annual_investment_return - return_span, 0),
+            annual_investment_return + return_span,
+            size,
+        )
+        contributions = np.linspace(
+            max(monthly_contribution * (1 - contribution_span / 100), 0),
+            monthly_contribution * (1 + contribution_span / 100),
+            size,
+        )
+        return build_sensitivity_frame(*inputs, returns, contributions)
+
+    return RESULT_CACHE.get_or_compute(key, compute)
+
+
+def cached_backtest(*inputs, **options):
+    """
+    backtest_retirement cached on the normalized inputs and options.
+    """
+    names = sorted(options)
+    key = ("backtest",) + normalize_inputs(*inputs, *names, *(options[name] for name in names))
+    return RESULT_CACHE.get_or_compute(key, lambda: backtest_retirement(*inputs, **options))
@@ -0,0 +1,316 @@
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from monte_carlo import PERCENTILES
+from retirement_calc import NO_RETIREMENT, calculate_retirement_age_batch
+
+# Most points per series sent to the browser, longer series are downsampled
+MAX_CHART_POINTS = 300
+
+
+def build_chart_frames(result):
+    """
+    Builds the DataFrames and key figures shown by the Streamlit apps for a
+    RetirementResult.
+
+    Both phases are sliced out of the timeline at its retirement_index, so
+    no row is compared or copied twice. Chart frames longer than
+    MAX_CHART_POINTS are downsampled with lttb_indices, keeping the two
+    rows around retirement so that the phases still meet.
+
+    Returns:
+        dict with the 'timeline' (indexed by age), the 'capital' and 'cost'
+        chart frames, the 'scenarios' table and the 'milestones' dict,
+        or None if retiring is impossible
+    """
+    if result.retirement_age is None:
+        return None
+
+    timeline = result.timeline
+    accumulation, retirement = timeline.accumulation, timeline.retirement
+    capital, monthly_cost = timeline.capital, timeline.monthly_cost
+    age = pd.Index(timeline.age, name='age', copy=False)
+
+    # One block for both charts, each column NaN outside its phase
+    phase_values = np.full((len(timeline), 4), np.nan)
+    phase_values[accumulation, 0] = capital[accumulation]
+    phase_values[retirement, 1] = capital[retirement]
+    phase_values[accumulation, 2] = monthly_cost[accumulation]
+    phase_values[retirement, 3] = monthly_cost[retirement]
+    phase_frame = pd.DataFrame(
+        phase_values,
+        index=age,
+        columns=[
+            'Faza akumulacji',
+            'Faza emerytury',
+            'Koszty podczas akumulacji',
+            'Koszty podczas emerytury',
+        ],
+        copy=False,
+    )
+    if len(timeline) > MAX_CHART_POINTS:
+        rows = lttb_indices(timeline.age, capital, MAX_CHART_POINTS)
+        boundary = [timeline.retirement_index - 1, timeline.retirement_index]
+        rows = np.union1d(rows, [row for row in boundary if 0 <= row < len(timeline)])
+        phase_frame = phase_frame.iloc[rows]
+
+    peak = int(capital.argmax())
+    retirement_costs = monthly_cost[retirement]
+    milestones = {
+        # Capital at the end of the last year of saving
+        'retirement_capital': float(capital[accumulation][-1]) if timeline.retirement_index else 0.0,
+        'max_capital': float(capital[peak]),
+        'max_capital_age': int(timeline.age[peak]),
+        # None if the plan has no retirement years to show
+        'retirement_monthly_cost': float(retirement_costs[0]) if len(retirement_costs) else None,
+        'final_monthly_cost': float(retirement_costs[-1]) if len(retirement_costs) else None,
+    }
+
+    retirement_ages = [item[0] for item in result.chart]
+    funds_depletion_ages = [item[1] for item in result.chart]
+
+    return {
+        'timeline': timeline.to_pandas(),
+        'capital': phase_frame.iloc[:, :2],
+        'cost': phase_frame.iloc[:, 2:],
+        'milestones': milestones,
+        'scenarios': pd.DataFrame({
+            'Wiek przejścia na emeryturę': retirement_ages,
+            'Wiek wyczerpania funduszy': funds_depletion_ages,
+            'Lata na emeryturze': [funds_age - ret_age for ret_age, funds_age in result.chart]
+        }),
+    }
+
+
+def build_fan_frame(ages, percentiles, max_points=MAX_CHART_POINTS):
+    """
+    Percentile bands of simulated capital paths as a chart frame.
+
+    Args:
+        ages: age at the end of every simulated year
+        percentiles: array of shape (len(PERCENTILES), years), e.g. from
+            MonteCarloResult.capital_percentiles
+        max_points: longer bands are downsampled with lttb_indices on the
+            median, at the same ages for every band
+
+    Returns:
+        DataFrame indexed by age with a P5 .. P95 column per percentile
+    """
+    ages = np.asarray(ages)
+    percentiles = np.asarray(percentiles)
+    rows = lttb_indices(ages, percentiles[len(PERCENTILES) // 2], max_points)
+    return pd.DataFrame(
+        percentiles[:, rows].T,
+        index=pd.Index(ages[rows], name='Wiek'),
+        columns=[f'P{percentile}' for percentile in PERCENTILES],
+    )
+
+
+def fan_chart(frame, retirement_age=None):
+    """
+    Altair fan chart of a build_fan_frame frame: the P5-P95 and P25-P75
+    bands around the median, with a dashed rule at the retirement age.
+    """
+    data = frame.reset_index()
+    base = alt.Chart(data).encode(x=alt.X('Wiek:Q', title='Wiek'))
+    layers = [
+        base.mark_area(opacity=0.25, color='#60a5fa').encode(
+            y=alt.Y('P5:Q', title='Kapitał (PLN)'), y2='P95:Q'
+        ),
+        base.mark_area(opacity=0.45, color='#3b82f6').encode(y='P25:Q', y2='P75:Q'),
+        base.mark_line(color='#1d4ed8').encode(
+            y='P50:Q',
+            tooltip=[
+                alt.Tooltip('Wiek:Q'),
+                alt.Tooltip('P5:Q', title='Pesymistycznie (P5)', format=',.0f'),
+                alt.Tooltip('P50:Q', title='Mediana (P50)', format=',.0f'),
+                alt.Tooltip('P95:Q', title='Optymistycznie (P95)', format=',.0f'),
+            ],
+        ),
+    ]
+    if retirement_age is not None:
+        layers.append(
+            alt.Chart(pd.DataFrame({'Wiek': [retirement_age]}))
+            .mark_rule(color='#f87171', strokeDash=[4, 4])
+            .encode(x='Wiek:Q')
+        )
+    return alt.layer(*layers)
+
+
+def lttb_indices(x, y, max_points):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+    of the series (x, y) to max_points points.
+
+    The first and last points are always kept. Each bucket in between keeps
+    the point that spans the largest triangle with the point kept before it
+    and the average of the next bucket, which preserves peaks and turns.
+
+    Returns:
+        sorted array of indices, all of them if the series is short enough
+    """
+    length = len(x)
+    if length <= max_points or max_points < 3:
+        return np.arange(length)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # max_points - 2 buckets between the first and the last point
+    edges = np.linspace(1, length - 1, max_points - 1).astype(int)
+    kept = np.empty(max_points, dtype=int)
+    kept[0], kept[-1] = 0, length - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[end:edges[bucket + 2]].mean()
+            next_y = y[end:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        kept[bucket + 1] = previous
+    return kept
+
+
+def build_comparison_frames(profiles, results):
+    """
+    Builds the overlay chart and the table of compared scenarios.
+
+    Args:
+        profiles: dict of scenario name to its inputs, keyed by argument name
+        results: non-empty dict of scenario name to RetirementResult with a
+            timeline, e.g. from ScenarioSet.evaluate
+
+    Returns:
+        dict with the 'capital' chart frame, indexed by age with one column
+        per possible scenario, and the 'table' of inputs and key figures,
+        one row per scenario
+    """
+    timelines = {name: result.timeline for name, result in results.items() if result.timeline is not None}
+    if timelines:
+        first = min(int(timeline.age[0]) for timeline in timelines.values())
+        last = max(int(timeline.age[-1]) for timeline in timelines.values())
+    else:
+        first, last = 0, -1
+    ages = np.arange(first, last + 1)
+
+    # One column per scenario, NaN outside its lifetime
+    capital = np.full((len(ages), len(timelines)), np.nan)
+    for column, timeline in enumerate(timelines.values()):
+        rows = timeline.age.astype(np.int64) - first
+        capital[rows, column] = timeline.capital
+
+    rows = []
+    for name, result in results.items():
+        profile = profiles[name]
+        row = {
+            'Scenariusz': name,
+            'Miesięczna inwestycja (PLN)': profile['monthly_contribution'],
+            'Miesięczne wydatki (PLN)': profile['retirement_value'],
+            'Stopa zwrotu (%)': profile['annual_investment_return'],
+            'Wiek emerytury': np.nan,
+            'Lata do emerytury': np.nan,
+            'Kapitał na start emerytury (PLN)': np.nan,
+            'Maksymalny kapitał (PLN)': np.nan,
+            'Kapitał końcowy (PLN)': np.nan,
+        }
+        timeline = result.timeline
+        if timeline is not None:
+            saved = timeline.capital[timeline.accumulation]
+            row.update({
+                'Wiek emerytury': result.retirement_age,
+                'Lata do emerytury': result.retirement_age - profile['current_age'],
+                # Capital at the end of the last year of saving
+                'Kapitał na start emerytury (PLN)': float(saved[-1]) if len(saved) else 0.0,
+                'Maksymalny kapitał (PLN)': float(timeline.capital.max()),
+                'Kapitał końcowy (PLN)': result.capital_after_retirement,
+            })
+        rows.append(row)
+
+    return {
+        'capital': pd.DataFrame(
+            capital, index=pd.Index(ages, name='Wiek'), columns=list(timelines), copy=False
+        ),
+        'table': pd.DataFrame(rows).set_index('Scenariusz'),
+    }
+
+
+def build_sensitivity_frame(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    returns,
+    contributions,
+):
+    """
+    Retirement age over every combination of returns and contributions,
+    computed in one calculate_retirement_age_batch call.
+
+    Args:
+        current_age, ..., starting_capital: inputs of calculate_retirement_age,
+            the return and contribution are replaced by the grid
+        returns: annual investment returns (in percentage), evenly spaced
+        contributions: monthly contributions, evenly spaced
+
+    Returns:
+        DataFrame with one row per combination, the return and contribution
+        with the edges of their cells and 'Wiek emerytury', NaN where
+        retiring is impossible
+    """
+    returns = np.asarray(returns, dtype=float)
+    contributions = np.asarray(contributions, dtype=float)
+    grid_return, grid_contribution = np.meshgrid(returns, contributions, indexing='ij')
+    profiles = grid_return.size
+
+    ages, _ = calculate_retirement_age_batch(
+        np.full(profiles, current_age),
+        grid_contribution.ravel(),
+        grid_return.ravel(),
+        np.full(profiles, death_age),
+        np.full(profiles, inflation),
+        np.full(profiles, retirement_value),
+        np.full(profiles, starting_capital),
+    )
+
+    return_step = _step(returns) / 2
+    contribution_step = _step(contributions) / 2
+    return pd.DataFrame({
+        'Stopa zwrotu (%)': grid_return.ravel(),
+        'Miesięczna inwestycja (PLN)': grid_contribution.ravel(),
+        'return_from': grid_return.ravel() - return_step,
+        'return_to': grid_return.ravel() + return_step,
+        'contribution_from': grid_contribution.ravel() - contribution_step,
+        'contribution_to': grid_contribution.ravel() + contribution_step,
+        'Wiek emerytury': np.where(ages == NO_RETIREMENT, np.nan, ages),
+    })
+
+
+def sensitivity_chart(frame):
+    """
+    Altair heatmap of a build_sensitivity_frame frame, impossible
+    combinations are left blank.
+    """
+    return alt.Chart(frame.dropna(subset=['Wiek emerytury'])).mark_rect().encode(
+        x=alt.X('return_from:Q', title='Stopa zwrotu (%)'),
+        x2='return_to:Q',
+        y=alt.Y('contribution_from:Q', title='Miesięczna inwestycja (PLN)'),
+        y2='contribution_to:Q',
+        color=alt.Color('Wiek emerytury:Q', scale=alt.Scale(scheme='redyellowgreen', reverse=True)),
+        tooltip=['Stopa zwrotu (%)', 'Miesięczna inwestycja (PLN)', 'Wiek emerytury'],
+    )
+
+
+def _step(values):
+    """
+    Spacing of evenly spaced values, 1 for a single value.
+    """
+    return float(values[1] - values[0]) if len(values) > 1 else 1.0
@@ -0,0 +1,118 @@
+import numpy as np
+
+from cache import normalize_inputs
+from inputs import INPUT_ORDER
+from retirement_calc import NO_RETIREMENT, RetirementResult, calculate_retirement_age_batch
+from timeline import Timeline
+
+# Most scenarios a session can compare at once
+MAX_SCENARIOS = 5
+
+
+class ScenarioSet:
+    """
+    Named parameter sets compared side by side, kept in the session state of
+    the Streamlit apps.
+
+    Results are stored by the normalized inputs they were computed for, so
+    evaluate() only computes scenarios that were added or changed since the
+    last call, all of them in a single calculate_retirement_age_batch call.
+
+    Args:
+        max_scenarios: number of scenarios kept at most
+    """
+
+    def __init__(self, max_scenarios=MAX_SCENARIOS):
+        self.max_scenarios = max_scenarios
+        # Profiles computed by the last evaluate(), shown in debug mode
+        self.last_computed = 0
+        self._profiles = {}
+        self._results = {}
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def __contains__(self, name):
+        return name in self._profiles
+
+    def names(self):
+        """
+        Names of the scenarios, in the order they were saved.
+        """
+        return list(self._profiles)
+
+    def profiles(self):
+        """
+        dict of scenario name to its inputs, keyed by argument name.
+        """
+        return dict(self._profiles)
+
+    def save(self, name, profile):
+        """
+        Saves profile, a dict of the calculate_retirement_age arguments, as
+        scenario name. Saving an existing name replaces its inputs.
+
+        Raises:
+            ValueError: if name is empty or max_scenarios are already saved
+        """
+        name = name.strip()
+        if not name:
+            raise ValueError("A scenario needs a name")
+        if name not in self._profiles and len(self._profiles) >= self.max_scenarios:
+            raise ValueError(f"At most {self.max_scenarios} scenarios can be compared")
+        self._profiles[name] = {key: profile[key] for key in INPUT_ORDER}
+
+    def remove(self, name):
+        self._profiles.pop(name, None)
+
+    def evaluate(self):
+        """
+        Results of all scenarios. Scenarios with the same inputs share one
+        result, results of removed or changed scenarios are dropped.
+
+        Returns:
+            dict of scenario name to RetirementResult, in the order the
+            scenarios were saved; results have a timeline but no chart
+        """
+        keys = {
+            name: normalize_inputs(*(profile[key] for key in INPUT_ORDER))
+            for name, profile in self._profiles.items()
+        }
+        missing = [inputs for inputs in dict.fromkeys(keys.values()) if inputs not in self._results]
+        if missing:
+            self._results.update(zip(missing, evaluate_batch(missing)))
+        self.last_computed = len(missing)
+        self._results = {inputs: self._results[inputs] for inputs in keys.values()}
+        return {name: self._results[inputs] for name, inputs in keys.items()}
+
+
+def evaluate_batch(profiles):
+    """
+    Plans of many profiles with calculate_retirement_age_batch, in one call.
+
+    Args:
+        profiles: sequence of tuples of the inputs in INPUT_ORDER
+
+    Returns:
+        list of RetirementResult, with the Timeline of every possible plan
+    """
+    if not profiles:
+        return []
+    columns = [np.asarray(column) for column in zip(*profiles)]
+    ages, capitals, capital, monthly_cost = calculate_retirement_age_batch(*columns, timelines=True)
+
+    results = []
+    for row, inputs in enumerate(profiles):
+        if ages[row] == NO_RETIREMENT:
+            results.append(RetirementResult(None, None, None))
+            continue
+        current_age, death_age = int(inputs[0]), int(inputs[3])
+        years = death_age - current_age
+        timeline = Timeline(
+            np.arange(current_age + 1, death_age + 1),
+            capital[row, :years],
+            monthly_cost[row, :years],
+            ages[row] - current_age,
+        )
+        results.append(RetirementResult(int(ages[row]), float(capitals[row]), None, timeline))
+    return results
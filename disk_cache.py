@@ -0,0 +1,162 @@
+import hashlib
+import sqlite3
+import struct
+import threading
+import time
+
+import numpy as np
+
+from retirement_calc import ENGINE_VERSION, RetirementResult
+from timeline import Timeline
+
+# Header of an encoded result: magic, retirement age (-1 if impossible),
+# capital after retirement, number of chart rows, number of timeline years
+# and the retirement index of the timeline
+_HEADER = struct.Struct("<4shdIII")
+_MAGIC = b"EMR1"
+
+
+def encode_result(result):
+    """
+    Encodes a RetirementResult as compact little-endian columns: the header,
+    the chart as int16 pairs, the ages as int16 and the capital and monthly
+    cost as float64.
+    """
+    if result.retirement_age is None:
+        return _HEADER.pack(_MAGIC, -1, 0.0, 0, 0, 0)
+
+    timeline = result.timeline
+    chart = np.asarray(result.chart, dtype="<i2").reshape(-1, 2)
+    return b"".join((
+        _HEADER.pack(
+            _MAGIC,
+            result.retirement_age,
+            result.capital_after_retirement,
+            len(chart),
+            len(timeline),
+            timeline.retirement_index,
+        ),
+        chart.tobytes(),
+        timeline.age.astype("<i2").tobytes(),
+        timeline.to_numpy().T.astype("<f8").tobytes(),
+    ))
+
+
+def decode_result(data):
+    """
+    Decodes the output of encode_result.
+    """
+    magic, retirement_age, capital_after_retirement, chart_rows, years, retirement_index = (
+        _HEADER.unpack_from(data)
+    )
+    if magic != _MAGIC:
+        raise ValueError("Not an encoded retirement result")
+    if retirement_age < 0:
+        return RetirementResult(None, None, None)
+
+    offset = _HEADER.size
+    chart = np.frombuffer(data, "<i2", chart_rows * 2, offset).reshape(-1, 2)
+    offset += chart.nbytes
+    age = np.frombuffer(data, "<i2", years, offset)
+    offset += age.nbytes
+    values = np.frombuffer(data, "<f8", years * 2, offset).reshape(2, years)
+    return RetirementResult(
+        retirement_age,
+        capital_after_retirement,
+        [tuple(row) for row in chart.tolist()],
+        timeline=Timeline(age, values[0], values[1], retirement_index),
+    )
+
+
+class DiskCache:
+    """
+    Cache of retirement results in a local SQLite database, shared by every
+    process on the machine.
+
+    The database runs in WAL mode so that readers never block each other.
+    Entries are keyed by a hash of the inputs, the engine and ENGINE_VERSION,
+    and the least recently used ones are evicted once the stored results
+    exceed max_bytes.
+
+    A hit only records its access time when the stored one is older than
+    touch_interval seconds, so most hits are a plain SELECT and don't wait
+    for SQLite's single writer.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, touch_interval=60):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key BLOB PRIMARY KEY, value BLOB NOT NULL,"
+                " size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)"
+            )
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def key(inputs, engine):
+        return hashlib.sha256(repr((ENGINE_VERSION, engine, inputs)).encode()).digest()
+
+    def get(self, inputs, engine):
+        """
+        Returns the cached RetirementResult, or None.
+        """
+        key = self.key(inputs, engine)
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT value, accessed FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            if now - row[1] >= self.touch_interval:
+                connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return decode_result(row[0])
+
+    def put(self, inputs, engine, result):
+        value = encode_result(result)
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (self.key(inputs, engine), value, len(value), time.time()),
+            )
+            self._evict(connection)
+
+    def _evict(self, connection):
+        (total,) = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Drop the least recently used entries until the rest fits
+        stale = []
+        for key, size in connection.execute("SELECT key, size FROM results ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def stats(self):
+        with self._connection() as connection:
+            entries, size = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'size': entries, 'bytes': size}
@@ -0,0 +1,241 @@
+import importlib.util
+import io
+
+import numpy as np
+import pandas as pd
+
+from inputs import INPUT_ORDER
+from retirement_calc import NO_RETIREMENT, calculate_retirement_age_batch
+from timeline import PHASES
+
+# Export formats with their MIME type and file extension. XLSX needs the
+# optional openpyxl package.
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+# Rows per chunk written at once
+CHUNK_ROWS = 50_000
+
+# Row limit of an Excel sheet, header included
+XLSX_MAX_ROWS = 1_048_576
+
+
+def available_formats():
+    """
+    Export formats usable in this environment.
+    """
+    return [
+        name for name in FORMATS
+        if name != "xlsx" or importlib.util.find_spec("openpyxl") is not None
+    ]
+
+
+def capital_columns(timeline):
+    """
+    Columns of the capital timeline: age, capital at the end of the year and
+    phase, as views of the Timeline arrays except for the phase names.
+    """
+    return {
+        "age": timeline.age,
+        "capital": timeline.capital,
+        "phase": _phases(timeline),
+    }
+
+
+def cost_columns(timeline):
+    """
+    Columns of the cost timeline: age, monthly cost and phase.
+    """
+    return {
+        "age": timeline.age,
+        "monthly_cost": timeline.monthly_cost,
+        "phase": _phases(timeline),
+    }
+
+
+def scenario_columns(result):
+    """
+    Columns of the retirement scenario table of a RetirementResult: each
+    retirement age with the age its funds run out.
+    """
+    chart = np.asarray(result.chart or [], dtype=np.int64).reshape(-1, 2)
+    return {
+        "retirement_age": chart[:, 0],
+        "funds_depletion_age": chart[:, 1],
+        "years_in_retirement": chart[:, 1] - chart[:, 0],
+    }
+
+
+def chunked(columns, chunk_rows=CHUNK_ROWS):
+    """
+    Splits equally long columns into chunks of at most chunk_rows rows.
+
+    Yields:
+        dicts of column name to a view of the rows of the chunk
+    """
+    rows = len(next(iter(columns.values()))) if columns else 0
+    for start in range(0, max(rows, 1), chunk_rows):
+        yield {name: values[start:start + chunk_rows] for name, values in columns.items()}
+
+
+def simulation_chunks(simulation, retirement_age, chunk_rows=CHUNK_ROWS):
+    """
+    Capital paths of a MonteCarloResult when retiring at retirement_age,
+    one row per path and one capital_<age> column per year. Only one chunk
+    of paths is evaluated at a time.
+
+    Yields:
+        dicts of column name to the values of the chunk
+    """
+    ages = simulation.retirement_ages + 1
+    for start in range(0, max(simulation.paths, 1), chunk_rows):
+        rows = slice(start, min(start + chunk_rows, simulation.paths))
+        capital = simulation.capital_paths(retirement_age, rows=rows)
+        chunk = {"path": np.arange(rows.start, rows.stop)}
+        chunk.update((f"capital_{age}", capital[:, year]) for year, age in enumerate(ages.tolist()))
+        yield chunk
+
+
+def batch_chunks(profiles, chunk_rows=CHUNK_ROWS):
+    """
+    Retirement age and capital after retirement of many profiles, computed
+    one chunk at a time with calculate_retirement_age_batch.
+
+    Args:
+        profiles: dict of the INPUT_ORDER names to equally long arrays
+
+    Yields:
+        dicts of the input columns plus retirement_age, a nullable Int64
+        column that is empty when retiring is impossible, and
+        capital_after_retirement, NaN then
+    """
+    for chunk in chunked({name: np.asarray(profiles[name]) for name in INPUT_ORDER}, chunk_rows):
+        ages, capitals = calculate_retirement_age_batch(*(chunk[name] for name in INPUT_ORDER))
+        impossible = ages == NO_RETIREMENT
+        chunk["retirement_age"] = pd.arrays.IntegerArray(ages.astype(np.int64), impossible)
+        chunk["capital_after_retirement"] = np.where(impossible, np.nan, capitals)
+        yield chunk
+
+
+def stream(chunks, file_format):
+    """
+    Encodes chunks of columns as a file, chunk by chunk.
+
+    CSV and Parquet bytes are yielded as soon as each chunk is encoded, a
+    Parquet row group per chunk. XLSX is a zip archive that can only be read
+    whole, so it is written to a temporary file first and yielded from there.
+
+    Args:
+        chunks: iterable of dicts of column name to array, e.g. from chunked
+        file_format: a key of FORMATS
+
+    Yields:
+        bytes
+    """
+    if file_format == "csv":
+        return _stream_csv(chunks)
+    if file_format == "parquet":
+        return _stream_parquet(chunks)
+    if file_format == "xlsx":
+        return _stream_xlsx(chunks)
+    raise ValueError(f"Unknown export format {file_format}, use one of {', '.join(FORMATS)}")
+
+
+def export_bytes(chunks, file_format):
+    """
+    The whole file of stream(chunks, file_format), for st.download_button.
+    """
+    return b"".join(stream(chunks, file_format))
+
+
+def _phases(timeline):
+    codes = (np.arange(len(timeline)) >= timeline.retirement_index).astype(np.int8)
+    return np.array(PHASES)[codes]
+
+
+def _stream_csv(chunks):
+    header = True
+    for chunk in chunks:
+        text = pd.DataFrame(chunk, copy=False).to_csv(index=False, header=header)
+        header = False
+        yield text.encode()
+
+
+class _Buffer(io.RawIOBase):
+    """
+    Write-only file collecting what pyarrow writes until it is drained.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _stream_parquet(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    buffer = _Buffer()
+    writer = None
+    for chunk in chunks:
+        table = pa.table(chunk)
+        if writer is None:
+            writer = pq.ParquetWriter(buffer, table.schema)
+        writer.write_table(table.cast(writer.schema))
+        yield buffer.drain()
+    if writer is not None:
+        writer.close()
+    yield buffer.drain()
+
+
+def _cell_values(column):
+    # openpyxl takes Python values, and an empty cell for NaN and pd.NA
+    values = column.tolist()
+    if column.dtype.kind in "fO":
+        return [None if pd.isna(value) else value for value in values]
+    return values
+
+
+def _stream_xlsx(chunks):
+    import tempfile
+
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    rows = 0
+    for chunk in chunks:
+        if not rows:
+            sheet.append(list(chunk))
+            rows = 1
+        columns = [_cell_values(np.asarray(column)) for column in chunk.values()]
+        rows += len(columns[0]) if columns else 0
+        if rows > XLSX_MAX_ROWS:
+            raise ValueError(f"An XLSX sheet holds at most {XLSX_MAX_ROWS:,} rows")
+        for row in zip(*columns):
+            sheet.append(row)
+
+    with tempfile.TemporaryFile() as file:
+        workbook.save(file)
+        file.seek(0)
+        while data := file.read(1024 * 1024):
+            yield data
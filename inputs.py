@@ -0,0 +1,134 @@
+import math
+
+import numpy as np
+
+# Inputs of calculate_retirement_age with the limits of their sidebar
+# widgets, shared by the Streamlit apps and the HTTP API so that both accept
+# the same values. Each entry holds the st.number_input arguments.
+INPUTS = {
+    "current_age": dict(
+        label="🎂 Obecny wiek", min_value=0, max_value=100, value=30, step=1,
+        help="Twój obecny wiek w latach",
+    ),
+    "starting_capital": dict(
+        label="💼 Kapitał początkowy (PLN)", min_value=0, value=300000, step=1000,
+        help="Ile pieniędzy masz już zaoszczędzone",
+    ),
+    "monthly_contribution": dict(
+        label="💸 Miesięczna inwestycja (PLN)", min_value=0, value=5000, step=100,
+        help="Ile planujesz inwestować każdego miesiąca",
+    ),
+    "annual_investment_return": dict(
+        label="📈 Średnia stopa zwrotu (%)", min_value=0.0, value=6.0, step=0.1,
+        help="Oczekiwana roczna stopa zwrotu z inwestycji",
+    ),
+    "inflation": dict(
+        label="🔥 Roczna inflacja (%)", min_value=0.0, value=3.0, step=0.1,
+        help="Przewidywana roczna inflacja",
+    ),
+    "retirement_value": dict(
+        label="🛒 Miesięczne wydatki (PLN)", min_value=0, value=12000, step=100,
+        help="Ile będziesz potrzebować miesięcznie na emeryturze",
+    ),
+    "death_age": dict(
+        label="⏰ Przewidywany wiek śmierci", min_value=50, max_value=120, value=90, step=1,
+        help="Do jakiego wieku planujesz żyć",
+    ),
+}
+
+# Argument order of calculate_retirement_age
+INPUT_ORDER = (
+    "current_age",
+    "monthly_contribution",
+    "annual_investment_return",
+    "death_age",
+    "inflation",
+    "retirement_value",
+    "starting_capital",
+)
+
+
+def validate_inputs(values):
+    """
+    Checks a mapping of inputs against the widget limits.
+
+    Integer widgets accept whole numbers only, float widgets any number.
+
+    Returns:
+        tuple of the inputs in INPUT_ORDER
+
+    Raises:
+        ValueError: naming the first missing, unknown or invalid input
+    """
+    unknown = sorted(set(values) - set(INPUTS))
+    if unknown:
+        raise ValueError(f"Unknown inputs: {', '.join(unknown)}")
+
+    validated = []
+    for name in INPUT_ORDER:
+        spec = INPUTS[name]
+        if name not in values:
+            raise ValueError(f"Missing input: {name}")
+        value = values[name]
+        # bool is an int, but never a valid amount
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{name} must be a number")
+        # Checked before int() and float(), which fail on NaN, infinity
+        # and integers beyond the float range with other errors
+        try:
+            finite = math.isfinite(value)
+        except OverflowError:
+            raise ValueError(f"{name} is too large") from None
+        if not finite:
+            raise ValueError(f"{name} must be finite")
+        if isinstance(spec["value"], int):
+            if value != int(value):
+                raise ValueError(f"{name} must be a whole number")
+            value = int(value)
+        else:
+            value = float(value)
+        if value < spec["min_value"]:
+            raise ValueError(f"{name} must be at least {spec['min_value']}")
+        if "max_value" in spec and value > spec["max_value"]:
+            raise ValueError(f"{name} must be at most {spec['max_value']}")
+        validated.append(value)
+    return tuple(validated)
+
+
+def check_input_columns(columns, whole_numbers=None):
+    """
+    validate_inputs for many profiles at once, one vectorized check per
+    input and limit.
+
+    Args:
+        columns: dict of the INPUT_ORDER names to equally long float arrays,
+            NaN where a value is missing or not a number
+        whole_numbers: inputs that must be whole numbers, by default those
+            of integer widgets
+
+    Returns:
+        object array with the error of the first invalid input of every
+        row, None where the row is valid
+    """
+    if whole_numbers is None:
+        whole_numbers = [name for name in INPUT_ORDER if isinstance(INPUTS[name]["value"], int)]
+    rows = len(columns[INPUT_ORDER[0]])
+    errors = np.full(rows, None, dtype=object)
+    # Later inputs are checked first, so that the first invalid one is reported
+    for name in reversed(INPUT_ORDER):
+        spec = INPUTS[name]
+        values = np.asarray(columns[name], dtype=float)
+        checks = [
+            (np.isnan(values), f"{name} must be a number"),
+            (np.isinf(values), f"{name} must be finite"),
+            (values < spec["min_value"], f"{name} must be at least {spec['min_value']}"),
+        ]
+        if name in whole_numbers:
+            checks.append((values != np.floor(values), f"{name} must be a whole number"))
+        if "max_value" in spec:
+            checks.append((values > spec["max_value"], f"{name} must be at most {spec['max_value']}"))
+        # The first failing check of an input wins, as in validate_inputs
+        with np.errstate(invalid="ignore"):
+            for invalid, message in reversed(checks):
+                errors[invalid] = message
+    return errors
@@ -0,0 +1,792 @@
+import time
+from functools import lru_cache, wraps
+from pathlib import Path
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+from cache import (
+    DISK_CACHE,
+    RESULT_CACHE,
+    cached_backtest,
+    cached_fan,
+    cached_retirement,
+    cached_sensitivity,
+    cached_simulation,
+)
+from charts import build_comparison_frames, fan_chart, sensitivity_chart
+from comparison import ScenarioSet
+from export import (
+    FORMATS,
+    available_formats,
+    capital_columns,
+    chunked,
+    cost_columns,
+    export_bytes,
+    scenario_columns,
+    simulation_chunks,
+)
+from inputs import INPUTS
+from monte_carlo import simulate_retirement
+from profiling import DEBUG_LOG, LIVE_BUDGET_MS, StageTimer, debug_enabled
+from solver import solve
+
+# Stylesheets of the themes, static/theme-<name>.css
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+THEMES = {
+    "auto": "🌓 Automatyczny",
+    "dark": "🌙 Ciemny",
+}
+
+SEPARATOR = "<hr style='margin: 3rem 0; border: 2px solid #404040;'>"
+
+COFFEE_LINK = """
+<a href="https://www.buymeacoffee.com/gons" target="_blank">
+    <img src="https://cdn.buymeacoffee.com/buttons/v2/default-yellow.png"
+         alt="Buy Me A Coffee"
+         style="height: 60px !important;width: 217px !important;" >
+</a>
+"""
+
+
+@lru_cache(maxsize=None)
+def theme_css(theme):
+    """
+    Stylesheet of a theme, read from disk once per server process.
+    """
+    return (STATIC_DIR / f"theme-{theme}.css").read_text(encoding="utf-8")
+
+
+def inject_theme(theme):
+    """
+    Adds the stylesheet of theme to the page.
+
+    Elements not sent again on a rerun are removed from the page, so the
+    stylesheet is part of every run. It is always the same element, though,
+    and Streamlit sends a cached element the browser already holds only as a
+    hash (see global.minCachedMessageSize in .streamlit/config.toml), so the
+    CSS goes over the wire once per session and theme.
+    """
+    st.markdown(f"<style>\n{theme_css(theme)}</style>", unsafe_allow_html=True)
+
+
+def select_theme(default_theme):
+    """
+    Theme picker at the top of the sidebar.
+
+    The first run of a session takes the theme from the ?theme= query
+    parameter, or default_theme, later runs keep the picked one.
+
+    Returns:
+        name of the picked theme, a key of THEMES
+    """
+    if "theme" not in st.session_state:
+        requested = st.query_params.get("theme")
+        st.session_state.theme = requested if requested in THEMES else default_theme
+    return st.sidebar.selectbox(
+        "🎨 Motyw", options=list(THEMES), format_func=THEMES.get, key="theme",
+        help="Wygląd strony, zmiana nie przelicza wyników"
+    )
+
+
+def render_page(default_theme="auto", script="app"):
+    """
+    The whole calculator page.
+
+    Args:
+        default_theme: theme of new sessions, a key of THEMES
+        script: name of the entry script, recorded in the timings log
+    """
+    # Page configuration
+    st.set_page_config(
+        page_title="Kalkulator Wczesnej Emerytury",
+        page_icon="💰",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+
+    # Stage timings, shown and logged with ?debug=1 or EMERYTURA_DEBUG=1
+    profiler = StageTimer(enabled=debug_enabled(st.query_params))
+
+    with profiler.stage("styles"):
+        inject_theme(select_theme(default_theme))
+
+    st.title("💰 Kalkulator Wczesnej Emerytury")
+    st.markdown("<div class='subtitle'>Zaplanuj swoją finansową przyszłość już dziś! 🚀</div>", unsafe_allow_html=True)
+
+    profile, engine, live, calculate_button = _sidebar()
+
+    # Results stay pinned to the session until the next calculation, so
+    # later reruns of the page or of one section don't call the engine.
+    # In live mode any change of the inputs is a new calculation.
+    calculation = st.session_state.get("calculation")
+    outdated = calculation is None or (calculation["profile"], calculation["engine"]) != (profile, engine)
+    if calculate_button or (live and outdated):
+        calculation = st.session_state.calculation = _calculate(profile, engine, profiler)
+        outdated = False
+        if live and calculation["ms"] > LIVE_BUDGET_MS:
+            # Switched off at the start of the rerun, before the toggle exists
+            st.session_state.live_over_budget = calculation["ms"]
+            st.rerun()
+
+    # Main content area
+    if calculation is None:
+        _welcome()
+    else:
+        if outdated:
+            st.info("✏️ Dane w panelu zmieniły się od ostatniego obliczenia. "
+                    "Kliknij \"OBLICZ EMERYTURĘ\", aby zaktualizować wyniki.")
+        _results(calculation, profiler, script)
+        _target(calculation, profiler, script)
+        _comparison(calculation, profiler, script)
+
+    _cache_stats()
+
+    # Stage timings of this run
+    if profiler.enabled:
+        profiler.log(script=script, calculated=bool(calculate_button), live=live)
+        with st.expander("🐞 Debug: czasy etapów"):
+            st.dataframe(pd.DataFrame({'Czas (ms)': profiler.timings()}))
+            st.caption(f"Cały skrypt: {profiler.total():,.1f} ms, log: {DEBUG_LOG}")
+    profiler.finish()
+
+
+def _section(function):
+    """
+    Turns a results section into an st.fragment, rerun on its own when one
+    of its widgets changes.
+
+    During a run of the page the section records its stages in the page's
+    timer. A rerun of the section alone gets a timer of its own, logged
+    with fragment=<section name> and shown under the section in debug mode.
+    """
+    name = function.__name__.lstrip("_")
+
+    @st.fragment
+    @wraps(function)
+    def run(calculation, profiler, script):
+        if not profiler.finished:
+            function(calculation, profiler)
+            return
+        timer = StageTimer(enabled=profiler.enabled)
+        function(calculation, timer)
+        if timer.enabled:
+            timer.log(script=script, fragment=name)
+            st.caption(f"🐞 Ponowne obliczenie sekcji: {timer.total():,.1f} ms")
+
+    return run
+
+
+def _sidebar():
+    """
+    Inputs of the sidebar.
+
+    Returns:
+        tuple of the engine inputs as a dict keyed by argument name, the
+        engine, whether live mode is on and the state of the button
+    """
+    # Live mode is left on only while the engine keeps to its budget
+    over_budget = st.session_state.pop("live_over_budget", None)
+    if over_budget is not None:
+        st.session_state.live = False
+
+    with st.sidebar:
+        st.markdown("### 🎯 Twoje dane finansowe")
+        st.markdown("---")
+
+        current_age = st.number_input(**INPUTS["current_age"])
+
+        capital = st.number_input(**INPUTS["starting_capital"])
+
+        monthly_contrib = st.number_input(**INPUTS["monthly_contribution"])
+
+        st.markdown("### 📊 Parametry inwestycyjne")
+        st.markdown("---")
+
+        annual_return = st.number_input(**INPUTS["annual_investment_return"])
+
+        inflation = st.number_input(**INPUTS["inflation"])
+
+        monthly_compounding = st.toggle(
+            "📅 Kapitalizacja miesięczna", value=False,
+            help="Wpłaty, wypłaty, odsetki i inflacja naliczane co miesiąc zamiast raz w roku"
+        )
+
+        st.markdown("### 🏠 Styl życia")
+        st.markdown("---")
+
+        annual_expenses = st.number_input(**INPUTS["retirement_value"])
+
+        projected_lifespan = st.number_input(**INPUTS["death_age"])
+
+        st.markdown("---")
+        live = st.toggle(
+            "⚡ Obliczenia na żywo", key="live",
+            help=f"Wyniki odświeżają się po każdej zmianie danych, o ile obliczenia trwają krócej niż {LIVE_BUDGET_MS} ms"
+        )
+        if over_budget is not None:
+            st.warning(f"⏱️ Obliczenia trwały {over_budget:,.0f} ms, dłużej niż {LIVE_BUDGET_MS} ms. "
+                       "Tryb na żywo został wyłączony.")
+        calculate_button = st.button("🚀 OBLICZ EMERYTURĘ", use_container_width=True, disabled=live)
+
+    profile = dict(
+        current_age=current_age,
+        monthly_contribution=monthly_contrib,
+        annual_investment_return=annual_return,
+        death_age=projected_lifespan,
+        inflation=inflation,
+        retirement_value=annual_expenses,
+        starting_capital=capital,
+    )
+    engine = "monthly" if monthly_compounding else None
+    return profile, engine, live, calculate_button
+
+
+def _section_header(title, subtitle, color):
+    st.markdown(f"""
+    <div class='chart-container'>
+        <h2 style='color: {color}; font-size: 2rem; margin-bottom: 0.5rem;'>{title}</h2>
+        <p style='color: #cccccc; font-size: 1.1rem;'>{subtitle}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def _welcome():
+    # Welcome screen with beautiful cards
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown("""
+        <div class='card-blue'>
+            <h3 style='color: #60a5fa; margin-bottom: 1rem;'>📊 Analiza</h3>
+            <p style='color: #cccccc; font-size: 1rem;'>Dokładne obliczenia uwzględniające inflację i stopy zwrotu</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col2:
+        st.markdown("""
+        <div class='card-orange'>
+            <h3 style='color: #fbbf24; margin-bottom: 1rem;'>📈 Wykresy</h3>
+            <p style='color: #cccccc; font-size: 1rem;'>Wizualizacja wzrostu kapitału i kosztów w czasie</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col3:
+        st.markdown("""
+        <div class='card-green'>
+            <h3 style='color: #4ade80; margin-bottom: 1rem;'>🎯 Planowanie</h3>
+            <p style='color: #cccccc; font-size: 1rem;'>Optymalizacja strategii finansowej na przyszłość</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    st.markdown("""
+    <div class='card-info'>
+        <h2 style='color: #60a5fa; margin-bottom: 1.5rem;'>🌟 Jak to działa?</h2>
+        <p style='font-size: 1.1rem; color: #cccccc; line-height: 1.6;'>
+            <strong>1.</strong> Wprowadź swoje dane w panelu po lewej stronie<br>
+            <strong>2.</strong> Kliknij przycisk "OBLICZ EMERYTURĘ"<br>
+            <strong>3.</strong> Analizuj wyniki i dostosuj swoją strategię!
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Buy Me A Coffee button
+    st.markdown(f"""
+    <div class='coffee-container'>
+        <p style='margin-bottom: 1rem; font-size: 0.9rem;'>
+            ☕ Jeśli ten kalkulator pomógł Ci w planowaniu emerytury, rozważ wsparcie projektu!
+        </p>
+        {COFFEE_LINK}
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def _calculate(profile, engine, profiler):
+    """
+    Runs the engine for the sidebar inputs.
+
+    Returns:
+        dict with the profile and engine it was computed for, the
+        RetirementResult, its chart frames and the milliseconds it took
+    """
+    started = time.perf_counter()
+    with st.spinner('🔄 Obliczam wiek emerytury i tworzę wykresy... ⏳'), profiler.stage("compute"):
+        # Engine result and chart frames are shared by identical inputs
+        result, frames = cached_retirement(**profile, engine=engine, timer=profiler)
+    return {
+        "profile": profile,
+        "engine": engine,
+        "result": result,
+        "frames": frames,
+        "ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+def _results(calculation, profiler, script):
+    profile, result, frames = calculation["profile"], calculation["result"], calculation["frames"]
+    current_age = profile["current_age"]
+    age, kapital_po_emeryturze = result.retirement_age, result.capital_after_retirement
+
+    if not age:
+        _impossible()
+        return
+
+    # Beautiful success message
+    st.markdown(f"""
+    <div class='success-box'>
+        🎉 GRATULACJE! 🎉<br>
+        Możesz przejść na emeryturę w wieku <strong>{age} lat</strong>!<br>
+        To już za <strong>{age - current_age} lat</strong>!
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Key metrics in beautiful cards
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown(f"""
+        <div class='card-metric-blue'>
+            <h3 style='color: #60a5fa; margin-bottom: 0.5rem;'>💰 Kapitał końcowy</h3>
+            <h2 style='color: #ffffff; font-size: 1.8rem;'>{kapital_po_emeryturze:,.0f} PLN</h2>
+            <p style='color: #cccccc;'>Pozostanie po śmierci</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col2:
+        years_to_retirement = age - current_age
+        total_invested = years_to_retirement * profile["monthly_contribution"] * 12 + profile["starting_capital"]
+        st.markdown(f"""
+        <div class='card-metric-orange'>
+            <h3 style='color: #fbbf24; margin-bottom: 0.5rem;'>📅 Lata do emerytury</h3>
+            <h2 style='color: #ffffff; font-size: 1.8rem;'>{years_to_retirement} lat</h2>
+            <p style='color: #cccccc;'>Czas na oszczędzanie</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col3:
+        st.markdown(f"""
+        <div class='card-metric-green'>
+            <h3 style='color: #4ade80; margin-bottom: 0.5rem;'>💸 Całkowita inwestycja</h3>
+            <h2 style='color: #ffffff; font-size: 1.8rem;'>{total_invested:,.0f} PLN</h2>
+            <p style='color: #cccccc;'>Łączne wpłaty</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    st.markdown(SEPARATOR, unsafe_allow_html=True)
+
+    # Capital over time chart
+    if frames is not None:
+        _section_header("📈 Kapitał w czasie", "Zobacz jak rośnie Twoja wartość netto!", "#60a5fa")
+
+        with st.spinner('🎨 Tworzę wykres kapitału w czasie...'), profiler.stage("chart_capital"):
+            # Display the line chart with colored series
+            st.line_chart(frames['capital'])
+
+        # Add phase information
+        st.write("**Legenda:**")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("🟢 **Faza akumulacji** - oszczędzanie do emerytury")
+        with col2:
+            st.write("🔴 **Faza emerytury** - wydawanie kapitału")
+
+        # Show key milestones
+        milestones = frames['milestones']
+        st.write("**Kluczowe punkty:**")
+        st.write(f"• Kapitał w momencie przejścia na emeryturę: {milestones['retirement_capital']:,.0f} PLN")
+        st.write(f"• Maksymalny kapitał: {milestones['max_capital']:,.0f} PLN w wieku {milestones['max_capital_age']} lat")
+
+    st.markdown(SEPARATOR, unsafe_allow_html=True)
+
+    # Monthly costs over time chart
+    if frames is not None:
+        _section_header("💸 Miesięczne koszty w czasie", "Wpływ inflacji na Twoje wydatki", "#fbbf24")
+
+        with st.spinner('📊 Tworzę wykres kosztów w czasie...'), profiler.stage("chart_cost"):
+            # Display the line chart
+            st.line_chart(frames['cost'])
+
+        # Show cost information
+        st.write("**Informacje o kosztach:**")
+        milestones = frames['milestones']
+        current_monthly_cost = profile["retirement_value"]
+        retirement_monthly_cost = milestones['retirement_monthly_cost']
+        final_monthly_cost = milestones['final_monthly_cost']
+        if retirement_monthly_cost is None:
+            retirement_monthly_cost = final_monthly_cost = current_monthly_cost
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Obecne koszty miesięczne", f"{current_monthly_cost:,.0f} PLN")
+        with col2:
+            st.metric("Koszty w momencie emerytury", f"{retirement_monthly_cost:,.0f} PLN",
+                     f"+{((retirement_monthly_cost/current_monthly_cost-1)*100):,.1f}%")
+        with col3:
+            st.metric("Koszty na koniec życia", f"{final_monthly_cost:,.0f} PLN",
+                     f"+{((final_monthly_cost/current_monthly_cost-1)*100):,.1f}%")
+
+        st.info(f"💡 **Wpływ inflacji:** Przy inflacji {profile['inflation']}% rocznie, Twoje koszty życia będą rosły każdego roku. "
+               f"To oznacza, że za {age - current_age} lat będziesz potrzebować {retirement_monthly_cost:,.0f} PLN miesięcznie "
+               f"zamiast obecnych {current_monthly_cost:,.0f} PLN, aby utrzymać ten sam standard życia.")
+
+    st.markdown(SEPARATOR, unsafe_allow_html=True)
+
+    _monte_carlo(calculation, profiler, script)
+    _backtest(calculation, profiler, script)
+    _sensitivity(calculation, profiler, script)
+    if result.chart:
+        _scenarios(calculation, profiler, script)
+    _export(calculation, profiler, script)
+
+
+@_section
+def _monte_carlo(calculation, profiler):
+    # Monte Carlo simulation with random returns and inflation
+    profile, age = calculation["profile"], calculation["result"].retirement_age
+    _section_header("🎲 Symulacja Monte Carlo", "Szansa powodzenia przy losowych stopach zwrotu i inflacji", "#60a5fa")
+
+    with st.expander("⚙️ Ustawienia symulacji"):
+        col1, col2 = st.columns(2)
+        with col1:
+            return_volatility = st.number_input(
+                "📉 Zmienność stopy zwrotu (%)", min_value=0.0, value=15.0, step=0.5,
+                help="Odchylenie standardowe rocznej stopy zwrotu"
+            )
+            inflation_volatility = st.number_input(
+                "🌡️ Zmienność inflacji (%)", min_value=0.0, value=1.5, step=0.1,
+                help="Odchylenie standardowe rocznej inflacji"
+            )
+        with col2:
+            correlation = st.slider(
+                "🔗 Korelacja zwrotu i inflacji", min_value=-1.0, max_value=1.0, value=0.0, step=0.1,
+                help="Jak bardzo stopa zwrotu i inflacja zmieniają się razem"
+            )
+            simulation_paths = st.number_input(
+                "🎲 Liczba symulacji", min_value=100, max_value=100000, value=10000, step=1000,
+                help="Liczba losowych scenariuszy zwrotów i inflacji"
+            )
+
+    simulation_options = dict(
+        return_volatility=return_volatility,
+        inflation_volatility=inflation_volatility,
+        correlation=correlation,
+        paths=simulation_paths,
+        seed=0,  # Same scenarios on every rerun
+    )
+    with st.spinner('🎲 Symuluję losowe scenariusze zwrotów i inflacji...'), profiler.stage("monte_carlo"):
+        # The fan first, its simulation also fills the cached summary
+        fan = cached_fan(age, **profile, **simulation_options)
+        simulation = cached_simulation(**profile, **simulation_options)
+        probability_data = pd.DataFrame(
+            {'Szansa powodzenia (%)': simulation.success_probability * 100},
+            index=pd.Index(simulation.retirement_ages, name='Wiek przejścia na emeryturę'),
+        )
+        st.line_chart(probability_data)
+
+    confident_age = simulation.retirement_age(0.9)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Wiek emerytury z 90% szansą", f"{confident_age} lat" if confident_age is not None else "Niemożliwy")
+    with col2:
+        st.metric(f"Szansa powodzenia w wieku {age} lat",
+                  f"{simulation.success_probability[age - profile['current_age']]:.0%}")
+
+    # Every simulated path reduced to percentile bands on the server
+    st.write(f"**Kapitał w czasie przy emeryturze w wieku {age} lat** (mediana i przedziały P25-P75 oraz P5-P95):")
+    with st.spinner('📈 Tworzę wykres rozkładu kapitału...'), profiler.stage("fan_chart"):
+        st.altair_chart(fan_chart(fan, age), use_container_width=True)
+
+    # One row per path is a large file, it is only encoded when asked for
+    with st.expander("📥 Eksport ścieżek symulacji"):
+        paths_format = _format_picker(key="paths_format")
+        if st.button(f"📦 Przygotuj plik ({simulation_paths:,} ścieżek)"):
+            with st.spinner('📦 Zapisuję ścieżki symulacji...'), profiler.stage("export_paths"):
+                # The cache keeps no paths, the fixed seed gives the same ones again
+                paths = simulate_retirement(**profile, **simulation_options)
+                data = export_bytes(simulation_chunks(paths, age), paths_format)
+            _download_button("💾 Pobierz ścieżki symulacji", data, f"symulacja_{age}", paths_format)
+
+    st.markdown(SEPARATOR, unsafe_allow_html=True)
+
+
+@_section
+def _backtest(calculation, profiler):
+    # The plan replayed over every historical starting year
+    profile, age = calculation["profile"], calculation["result"].retirement_age
+    years = age - profile["current_age"]
+    _section_header("📜 Test historyczny", "Jak Twój plan poradziłby sobie, zaczynając w każdym roku od 1991", "#4ade80")
+
+    history_inflation = st.selectbox(
+        "🏦 Inflacja historyczna", options=["us_cpi", "pl_cpi"],
+        format_func={"us_cpi": "🇺🇸 Inflacja w USA", "pl_cpi": "🇵🇱 Inflacja w Polsce"}.get,
+        help="Zwroty z S&P 500 z lat 1991-2024 łączone z inflacją z tych samych lat"
+    )
+
+    with st.spinner('📜 Sprawdzam plan na danych historycznych...'), profiler.stage("backtest"):
+        backtest = cached_backtest(
+            current_age=profile["current_age"],
+            monthly_contribution=profile["monthly_contribution"],
+            death_age=profile["death_age"],
+            retirement_value=profile["retirement_value"],
+            starting_capital=profile["starting_capital"],
+            inflation=history_inflation,
+        )
+        history_data = pd.DataFrame(
+            {'Odsetek udanych startów (%)': backtest.success_rate * 100},
+            index=pd.Index(backtest.retirement_ages, name='Wiek przejścia na emeryturę'),
+        )
+        st.line_chart(history_data)
+
+    safe_age = backtest.retirement_age(1.0)
+    worst_depletion = backtest.worst_depletion_age[years]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Wiek emerytury udany w każdym roku", f"{safe_age} lat" if safe_age is not None else "Niemożliwy")
+    with col2:
+        st.metric(f"Udane starty w wieku {age} lat",
+                  f"{backtest.success_rate[years]:.0%}")
+    with col3:
+        st.metric(f"Najgorszy przypadek w wieku {age} lat",
+                  "Środki wystarczają" if np.isnan(worst_depletion) else f"Brak środków w wieku {worst_depletion:.0f} lat",
+                  None if np.isnan(worst_depletion) else f"start w {backtest.worst_start_year[years]}",
+                  delta_color="inverse")
+
+    st.caption("Okresy dłuższe niż dostępna historia są kontynuowane od jej początku.")
+
+    st.markdown(SEPARATOR, unsafe_allow_html=True)
+
+
+@_section
+def _sensitivity(calculation, profiler):
+    # Sensitivity of the retirement age to the return and contribution
+    _section_header("🧭 Analiza wrażliwości", "Wiek emerytury przy innej stopie zwrotu i miesięcznej inwestycji", "#fbbf24")
+
+    with st.expander("⚙️ Ustawienia mapy"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            return_span = st.slider(
+                "📈 Zakres stopy zwrotu (± p.p.)", min_value=0.5, max_value=10.0, value=3.0, step=0.5,
+                help="O ile punktów procentowych stopa zwrotu zmienia się na mapie"
+            )
+        with col2:
+            contribution_span = st.slider(
+                "💸 Zakres miesięcznej inwestycji (± %)", min_value=10, max_value=100, value=100, step=10,
+                help="O ile procent miesięczna inwestycja zmienia się na mapie"
+            )
+        with col3:
+            sensitivity_size = st.slider(
+                "🔢 Rozdzielczość mapy", min_value=10, max_value=100, value=50, step=10,
+                help="Liczba wartości stopy zwrotu i inwestycji na mapie"
+            )
+
+    with st.spinner('🧭 Obliczam mapę wrażliwości...'), profiler.stage("sensitivity"):
+        sensitivity = cached_sensitivity(
+            *calculation["profile"].values(),
+            return_span=return_span,
+            contribution_span=contribution_span,
+            size=sensitivity_size,
+        )
+        st.altair_chart(sensitivity_chart(sensitivity), use_container_width=True)
+
+    st.caption("Puste pola oznaczają kombinacje, przy których przejście na emeryturę nie jest możliwe.")
+    if calculation["engine"] == "monthly":
+        # The batch engine of the map only compounds once a year
+        st.caption("Mapa używa kapitalizacji rocznej, więc wiek emerytury może różnić się od wyniku powyżej.")
+
+    st.markdown(SEPARATOR, unsafe_allow_html=True)
+
+
+@_section
+def _scenarios(calculation, profiler):
+    # Tworzenie wykresu danych z tabeli chart
+    scenarios = calculation["frames"]['scenarios']
+    _section_header("📊 Analiza scenariuszy emerytury", "Porównanie różnych strategii emerytalnych", "#4ade80")
+
+    with st.spinner('🔍 Tworzę wykres scenariuszy emerytury...'), profiler.stage("chart_scenarios"):
+        # Wykres liniowy
+        st.line_chart(scenarios, x='Wiek przejścia na emeryturę', y='Wiek wyczerpania funduszy')
+
+    st.markdown(SEPARATOR, unsafe_allow_html=True)
+
+    # Buy Me A Coffee button on results page
+    st.markdown(f"""
+    <div class='coffee-container'>
+        <p style='margin-bottom: 1rem; font-size: 0.95rem;'>
+            🎯 <strong>Czy te analizy pomogły Ci w planowaniu emerytury?</strong><br>
+            Wspomóż rozwój kalkulatora i dodawanie nowych funkcji!
+        </p>
+        {COFFEE_LINK}
+    </div>
+    """, unsafe_allow_html=True)
+    # Dodatkowa tabela z danymi
+    st.subheader("📋 Szczegółowe dane")
+
+    # The table is only sent to the browser when asked for
+    if st.toggle("📋 Pokaż tabelę scenariuszy", value=False):
+        with st.spinner('Przygotowuję szczegółowe dane...'), profiler.stage("table"):
+            # Tabela scenariuszy z tych samych danych co wykres
+            st.dataframe(scenarios)
+
+
+@_section
+def _export(calculation, profiler):
+    # The tables behind the charts as files, encoded from the engine arrays
+    result = calculation["result"]
+    st.subheader("📥 Eksport danych")
+    file_format = _format_picker(key="export_format")
+
+    # Files are only encoded when asked for and are kept with the pinned
+    # calculation, so other reruns, e.g. in live mode, encode nothing
+    files = calculation.setdefault("exports", {})
+    if file_format not in files and st.button("📦 Przygotuj pliki"):
+        tables = {
+            "kapital": ("💰 Kapitał w czasie", capital_columns(result.timeline)),
+            "koszty": ("💸 Koszty w czasie", cost_columns(result.timeline)),
+        }
+        if result.chart:
+            tables["scenariusze"] = ("📊 Scenariusze emerytury", scenario_columns(result))
+        with profiler.stage("export"):
+            files[file_format] = {
+                name: (label, export_bytes(chunked(columns), file_format))
+                for name, (label, columns) in tables.items()
+            }
+
+    if file_format in files:
+        prepared = files[file_format]
+        for column, (name, (label, data)) in zip(st.columns(len(prepared)), prepared.items()):
+            with column:
+                _download_button(label, data, name, file_format)
+
+
+def _format_picker(key):
+    return st.selectbox(
+        "📄 Format pliku", options=available_formats(), format_func=str.upper, key=key,
+        help="XLSX wymaga pakietu openpyxl"
+    )
+
+
+def _download_button(label, data, name, file_format):
+    mime, extension = FORMATS[file_format]
+    # Downloading doesn't change the page, no rerun needed
+    st.download_button(
+        label, data=data, file_name=f"{name}.{extension}", mime=mime,
+        on_click="ignore", use_container_width=True
+    )
+
+
+def _impossible():
+    st.markdown("""
+    <div class='error-card'>
+        <h2 style='color: #f87171; margin-bottom: 1rem;'>😞 Ups! Coś nie gra...</h2>
+        <p style='font-size: 1.1rem; color: #fca5a5; margin-bottom: 1rem;'>Z podanymi parametrami przejście na emeryturę nie jest możliwe.</p>
+        <p style='color: #fca5a5; font-weight: bold; margin-bottom: 0.5rem;'>💡 Spróbuj:</p>
+        <p style='color: #fca5a5; line-height: 1.6;'>
+        • Zwiększyć miesięczne inwestycje<br>
+        • Zmniejszyć miesięczne wydatki<br>
+        • Wydłużyć okres oszczędzania<br>
+        • Zwiększyć oczekiwaną stopę zwrotu
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+@_section
+def _target(calculation, profiler):
+    # What it takes to retire at the target age, each input on its own
+    profile, engine = calculation["profile"], calculation["engine"]
+    target_age = st.number_input(
+        "🏁 Docelowy wiek emerytury", min_value=0, max_value=120, value=50, step=1,
+        help="W jakim wieku chcesz przejść na emeryturę"
+    )
+    st.subheader(f"🏁 Jak przejść na emeryturę w wieku {target_age} lat?")
+    with profiler.stage("solver"):
+        required_contribution = solve("monthly_contribution", target_age, **profile, engine=engine)
+        required_capital = solve("starting_capital", target_age, **profile, engine=engine)
+        sustainable_expenses = solve("retirement_value", target_age, **profile, engine=engine)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Wymagana miesięczna inwestycja",
+                  f"{required_contribution:,.0f} PLN" if required_contribution is not None else "Niemożliwe")
+    with col2:
+        st.metric("Wymagany kapitał początkowy",
+                  f"{required_capital:,.0f} PLN" if required_capital is not None else "Niemożliwe")
+    with col3:
+        st.metric("Maksymalne miesięczne wydatki",
+                  f"{sustainable_expenses:,.0f} PLN" if sustainable_expenses is not None else "Niemożliwe")
+    st.caption("Każda wartość zakłada, że pozostałe dane pozostają bez zmian.")
+
+
+@_section
+def _comparison(calculation, profiler):
+    # Saved parameter sets of the session overlaid on one chart
+    st.markdown(SEPARATOR, unsafe_allow_html=True)
+    _section_header("⚖️ Porównanie scenariuszy", "Zapisz kilka wariantów planu i porównaj je na jednym wykresie", "#60a5fa")
+
+    # Results are kept with the scenarios, only new or changed ones are computed
+    scenario_set = st.session_state.setdefault("scenario_set", ScenarioSet())
+    full = len(scenario_set) >= scenario_set.max_scenarios
+
+    if "scenario_name" not in st.session_state:
+        st.session_state.scenario_name = _new_scenario_name(scenario_set)
+    col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
+    with col1:
+        name = st.text_input(
+            "🏷️ Nazwa scenariusza", key="scenario_name",
+            help="Zapisuje dane ostatniego obliczenia, istniejąca nazwa zostaje nadpisana"
+        ).strip()
+    with col2:
+        # Saved in a callback, before the section reruns and shows it
+        st.button("💾 Zapisz scenariusz", use_container_width=True,
+                  on_click=_save_scenario, args=(scenario_set, calculation["profile"]),
+                  disabled=not name or (full and name not in scenario_set))
+    if full:
+        st.caption(f"Można porównać najwyżej {scenario_set.max_scenarios} scenariuszy.")
+
+    if len(scenario_set):
+        col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
+        with col1:
+            removed = st.selectbox("🗑️ Scenariusz do usunięcia", options=scenario_set.names())
+        with col2:
+            if st.button("🗑️ Usuń scenariusz", use_container_width=True):
+                scenario_set.remove(removed)
+
+    if not len(scenario_set):
+        st.info("💡 Zapisz co najmniej jeden scenariusz, aby zobaczyć porównanie.")
+        return
+
+    with st.spinner('⚖️ Porównuję scenariusze...'), profiler.stage("comparison"):
+        results = scenario_set.evaluate()
+        frames = build_comparison_frames(scenario_set.profiles(), results)
+        st.line_chart(frames['capital'], y_label='Kapitał (PLN)')
+        table = frames['table']
+        formats = {column: '{:,.0f}' for column in table.columns} | {'Stopa zwrotu (%)': '{:.1f}'}
+        st.dataframe(table.style.format(formats, na_rep='Niemożliwy'))
+    if profiler.enabled:
+        st.caption(f"🐞 Obliczone scenariusze: {scenario_set.last_computed} z {len(scenario_set)}")
+    st.caption("Porównanie używa kapitalizacji rocznej.")
+
+
+def _new_scenario_name(scenario_set):
+    number = len(scenario_set) + 1
+    while f"Scenariusz {number}" in scenario_set:
+        number += 1
+    return f"Scenariusz {number}"
+
+
+def _save_scenario(scenario_set, profile):
+    scenario_set.save(st.session_state.scenario_name, profile)
+    st.session_state.scenario_name = _new_scenario_name(scenario_set)
+
+
+def _cache_stats():
+    # Cache statistics of this server process
+    cache_stats = RESULT_CACHE.stats()
+    st.sidebar.caption(
+        f"🗄️ Cache: {cache_stats['hits']} trafień, {cache_stats['misses']} chybień, "
+        f"{cache_stats['size']} wyników"
+    )
+    if DISK_CACHE:
+        disk_stats = DISK_CACHE.stats()
+        st.sidebar.caption(
+            f"💾 Cache dyskowy: {disk_stats['hits']} trafień, {disk_stats['misses']} chybień, "
+            f"{disk_stats['bytes'] / 1024:,.0f} KB"
+        )
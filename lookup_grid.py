@@ -0,0 +1,288 @@
+import argparse
+import bisect
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from retirement_calc import (
+    ENGINE_VERSION,
+    _batch_discounted_flows,
+    _closed_form_final_capital,
+    find_retirement_age,
+)
+
+# (start, stop, step) of the return and inflation axes (in percentage), both
+# ends included, and the longest horizon in years
+DEFAULT_RESOLUTION = {
+    "annual_investment_return": (0, 15, 0.1),
+    "inflation": (0, 10, 0.1),
+    "years": 120,
+}
+
+
+class LookupGrid:
+    """
+    Precomputed annuity factors for instant retirement ages, memory-mapped
+    from a .npy file with a .json file of metadata next to it.
+
+    The closed-form engine retires after n years as soon as
+    starting_capital + (contribution + withdrawal) * flows[n] > withdrawal * flows[years],
+    where flows only depends on the return and the inflation. The grid keeps
+    flows for every (return, inflation) grid point and year, so the age,
+    contribution, spending, starting capital and death age of a query are
+    free and the earliest age is a binary search over one row.
+
+    Between grid points the retirement age lies between the ages of the most
+    and the least favourable neighbouring corner (with non-negative starting
+    capital, higher return and lower inflation never retire later; debts are
+    always recomputed). When both agree the answer is exact,
+    otherwise, near a decision boundary, the query is recomputed, unless they
+    differ by at most `tolerance` years, in which case the later age is
+    returned.
+    """
+
+    def __init__(self, flows, metadata, tolerance=0):
+        # Plain ndarray view of the memory map, indexing a np.memmap is slower
+        self.flows = np.asarray(flows)
+        self.metadata = metadata
+        self.tolerance = tolerance
+        self.returns = metadata["axes"]["annual_investment_return"]
+        self.inflations = metadata["axes"]["inflation"]
+        self.grid_hits = 0
+        self.recomputed = 0
+
+    @classmethod
+    def build(cls, path, resolution=DEFAULT_RESOLUTION, validation_samples=2000, seed=0):
+        """
+        Computes the grid and saves it to path (.npy) and its metadata (.json).
+
+        Returns:
+            LookupGrid loaded from the saved file
+        """
+        started = time.perf_counter()
+        axes = {}
+        for name in ("annual_investment_return", "inflation"):
+            start, stop, step = resolution[name]
+            axes[name] = np.round(np.arange(start, stop + step / 2, step), 10).tolist()
+
+        growth = 1 + np.asarray(axes["annual_investment_return"])[:, None, None] / 100
+        indexation = 1 + np.asarray(axes["inflation"])[None, :, None] / 100
+        flows = _batch_discounted_flows(growth, indexation, np.arange(resolution["years"] + 1))
+
+        path = Path(path)
+        np.save(path, flows)
+        metadata = {
+            "engine_version": ENGINE_VERSION,
+            "axes": axes,
+            "resolution": {
+                name: list(value) if isinstance(value, tuple) else value
+                for name, value in resolution.items()
+            },
+            "cells": int(flows.size),
+            "bytes": int(flows.nbytes),
+            "build_seconds": round(time.perf_counter() - started, 3),
+        }
+        grid = cls(np.load(path, mmap_mode="r"), metadata)
+        metadata["validation"] = grid.validate(validation_samples, seed)
+        path.with_suffix(".json").write_text(json.dumps(metadata, indent=2))
+        return grid
+
+    @classmethod
+    def load(cls, path, tolerance=0):
+        """
+        Memory-maps a grid saved by build.
+        """
+        path = Path(path)
+        metadata = json.loads(path.with_suffix(".json").read_text())
+        if metadata["engine_version"] != ENGINE_VERSION:
+            raise ValueError(
+                f"{path} was built by engine version {metadata['engine_version']}, "
+                f"rebuild it for version {ENGINE_VERSION}"
+            )
+        return cls(np.load(path, mmap_mode="r"), metadata, tolerance)
+
+    def query(self, *inputs):
+        """
+        Retirement age for the inputs of calculate_retirement_age, from the
+        grid when possible and recomputed otherwise.
+
+        Returns:
+            retirement_age: or None if impossible
+        """
+        return self.plan(*inputs)[0]
+
+    def plan(
+        self,
+        current_age,
+        monthly_contribution,
+        annual_investment_return,
+        death_age,
+        inflation,
+        retirement_value,
+        starting_capital,
+    ):
+        """
+        Same as query, but also the capital left at death, computed in O(1)
+        for the age found in the grid.
+
+        Returns:
+            retirement_age, capital_after_retirement: or None, None if impossible
+        """
+        inputs = (
+            current_age,
+            monthly_contribution,
+            annual_investment_return,
+            death_age,
+            inflation,
+            retirement_value,
+            starting_capital,
+        )
+        years = death_age - current_age
+        return_index = _bracket(self.returns, annual_investment_return)
+        inflation_index = _bracket(self.inflations, inflation)
+        supported = (
+            return_index is not None
+            and inflation_index is not None
+            and 0 < years < self.flows.shape[2]
+            and retirement_value >= 0
+            # A debt grows faster with a higher return, the corners don't bracket the age
+            and starting_capital >= 0
+            and monthly_contribution + retirement_value > 0
+        )
+
+        if supported:
+            contribution, withdrawal = monthly_contribution * 12, retirement_value * 12
+            # Most favourable corner: highest return, lowest inflation
+            earliest = _accumulation_years(
+                self.flows[return_index[-1], inflation_index[0]],
+                years, contribution, withdrawal, starting_capital,
+            )
+            latest = _accumulation_years(
+                self.flows[return_index[0], inflation_index[-1]],
+                years, contribution, withdrawal, starting_capital,
+            )
+            if earliest == latest or (
+                latest < years and latest - earliest <= self.tolerance
+            ):
+                self.grid_hits += 1
+                if latest == years:
+                    return None, None
+                return current_age + latest, _closed_form_final_capital(*inputs, current_age + latest)
+
+        self.recomputed += 1
+        return find_retirement_age(*inputs)
+
+    def validate(self, samples=2000, seed=0):
+        """
+        Compares queries at random points of the grid's range with the exact
+        engine.
+
+        Returns:
+            dict with the share answered from the grid, the share of wrong
+            answers and the largest error in years
+        """
+        rng = np.random.default_rng(seed)
+        grid_hits, recomputed = self.grid_hits, self.recomputed
+        answered = wrong = max_error = 0
+        for _ in range(samples):
+            current_age = int(rng.integers(18, 70))
+            inputs = (
+                current_age,
+                float(rng.uniform(0, 20000)),
+                float(rng.uniform(self.returns[0], self.returns[-1])),
+                int(rng.integers(current_age + 1, current_age + self.flows.shape[2])),
+                float(rng.uniform(self.inflations[0], self.inflations[-1])),
+                float(rng.uniform(1000, 30000)),
+                # No capital, savings or a debt
+                float(rng.choice([0, rng.uniform(0, 2_000_000), rng.uniform(-1_000_000, 0)])),
+            )
+            before = self.grid_hits
+            answer = self.query(*inputs)
+            answered += self.grid_hits - before
+            exact = find_retirement_age(*inputs)[0]
+            if answer != exact:
+                wrong += 1
+                if answer is None or exact is None:
+                    max_error = float("inf")
+                else:
+                    max_error = max(max_error, abs(answer - exact))
+        self.grid_hits, self.recomputed = grid_hits, recomputed
+        return {
+            "samples": samples,
+            "tolerance": self.tolerance,
+            "answered_from_grid": answered / max(samples, 1),
+            "wrong": wrong / max(samples, 1),
+            "max_error_years": max_error,
+        }
+
+    def report(self):
+        """
+        Grid resolution, size, validation and the counters of this process.
+        """
+        return {
+            "resolution": self.metadata["resolution"],
+            "cells": self.metadata["cells"],
+            "bytes": self.metadata["bytes"],
+            "tolerance": self.tolerance,
+            "validation": self.metadata.get("validation"),
+            "grid_hits": self.grid_hits,
+            "recomputed": self.recomputed,
+        }
+
+
+def _bracket(axis, value):
+    """
+    Indices of the grid points around value: one if it lies on the grid, two
+    if it lies between them, None if it is outside the axis.
+    """
+    if not axis[0] - 1e-9 <= value <= axis[-1] + 1e-9:
+        return None
+    upper = min(bisect.bisect_left(axis, value - 1e-9), len(axis) - 1)
+    if abs(axis[upper] - value) <= 1e-9:
+        return (upper,)
+    return (upper - 1, upper)
+
+
+def _accumulation_years(flows, years, contribution, withdrawal, starting_capital):
+    """
+    Earliest number of accumulation years that leaves capital at death, or
+    `years` if there is none. flows grows with the year, so this is a binary
+    search for the first flows[n] above the break-even value.
+    """
+    break_even = (withdrawal * flows[years] - starting_capital) / (contribution + withdrawal)
+    return int(np.searchsorted(flows[:years], break_even, side="right"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a retirement age lookup grid")
+    parser.add_argument("command", choices=("build", "report"))
+    parser.add_argument("path", help="grid .npy file, metadata is kept next to it as .json")
+    for name in ("annual_investment_return", "inflation"):
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            nargs=3,
+            type=float,
+            metavar=("START", "STOP", "STEP"),
+            default=DEFAULT_RESOLUTION[name],
+        )
+    parser.add_argument("--years", type=int, default=DEFAULT_RESOLUTION["years"])
+    parser.add_argument("--tolerance", type=int, default=0, help="accepted error in years")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        resolution = {
+            "annual_investment_return": tuple(args.annual_investment_return),
+            "inflation": tuple(args.inflation),
+            "years": args.years,
+        }
+        LookupGrid.build(args.path, resolution)
+    grid = LookupGrid.load(args.path, args.tolerance)
+    if args.tolerance:
+        grid.metadata["validation"] = grid.validate()
+    print(json.dumps(grid.report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,208 @@
-def main():
-    print("Hello from emerytura!")
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from inputs import check_input_columns
+from retirement_calc import NO_RETIREMENT, calculate_retirement_age_batch
+
+# Columns every input row needs, the arguments of calculate_retirement_age.
+# Any other column is copied to the output unchanged.
+INPUT_COLUMNS = (
+    "current_age",
+    "monthly_contribution",
+    "annual_investment_return",
+    "death_age",
+    "inflation",
+    "retirement_value",
+    "starting_capital",
+)
+
+# Inputs the engine takes as integers, amounts may have fractions
+WHOLE_NUMBER_COLUMNS = ("current_age", "death_age")
+
+# Formats recognised from the file extension
+INPUT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+OUTPUT_FORMATS = {".csv": "csv", ".parquet": "parquet"}
+
+
+def read_profiles(path, input_format, chunk_size):
+    """
+    Streams client profiles from a CSV or JSONL file.
+
+    Yields:
+        DataFrames of at most chunk_size rows
+    """
+    if input_format == "csv":
+        # Text as it is, process_chunk parses the inputs, so no chunk's
+        # types depend on what pandas infers from its rows
+        reader = pd.read_csv(path, chunksize=chunk_size, dtype=str)
+    else:
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size)
+    with reader:
+        for chunk in reader:
+            missing = [column for column in INPUT_COLUMNS if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"{path} lacks the columns {', '.join(missing)}")
+            yield chunk
+
+
+def process_chunk(chunk):
+    """
+    Adds the retirement_age and capital_after_retirement columns to a chunk
+    of profiles, computed in one calculate_retirement_age_batch call.
+
+    Rows are checked against the limits of the sidebar widgets first. The
+    error column names the first invalid input of a row, whose results are
+    left empty, and is empty for valid rows.
+
+    Every chunk has the same column types, so that Parquet chunks share one
+    schema: the inputs as float64, NaN where they are not a number, and the
+    other columns as strings.
+    """
+    columns = {
+        column: pd.to_numeric(chunk[column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        for column in INPUT_COLUMNS
+    }
+    errors = check_input_columns(columns, WHOLE_NUMBER_COLUMNS)
+    valid = pd.isna(errors)
+
+    retirement_age = np.full(len(chunk), NO_RETIREMENT, dtype=np.int64)
+    capital_after_retirement = np.full(len(chunk), np.nan)
+    retirement_age[valid], capital_after_retirement[valid] = calculate_retirement_age_batch(
+        *(columns[column][valid] for column in INPUT_COLUMNS)
+    )
+    chunk = chunk.astype("string")
+    for column in INPUT_COLUMNS:
+        chunk[column] = columns[column]
+    chunk["retirement_age"] = pd.array(retirement_age, dtype="Int64")
+    chunk["retirement_age"] = chunk["retirement_age"].mask(retirement_age == NO_RETIREMENT)
+    chunk["capital_after_retirement"] = capital_after_retirement
+    # A string column even when every row is valid, so Parquet chunks agree
+    chunk["error"] = pd.array(errors, dtype="string")
+    return chunk
+
+
+def process_chunks(chunks, workers):
+    """
+    Runs process_chunk over chunks, in order. With several workers at most
+    two chunks per worker are in flight, so memory stays bounded however
+    long the input is.
+    """
+    if workers == 1:
+        yield from map(process_chunk, chunks)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(process_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class ResultWriter:
+    """
+    Appends result chunks to a CSV or Parquet file as they arrive.
+    """
+
+    def __init__(self, path, output_format):
+        self.path = path
+        self.output_format = output_format
+        self._parquet = None
+        self._schema = None
+        self._header = True
+
+    def write(self, chunk):
+        if self.output_format == "csv":
+            chunk.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._parquet is None:
+            self._schema = table.schema
+            self._parquet = pq.ParquetWriter(self.path, self._schema)
+        # Later chunks may infer narrower types, e.g. a column of only nulls
+        self._parquet.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def _file_format(path, formats, explicit):
+    if explicit:
+        return explicit
+    file_format = formats.get(Path(path).suffix.lower())
+    if file_format is None:
+        raise ValueError(f"Cannot tell the format of {path}, use one of {', '.join(formats)}")
+    return file_format
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Calculate the retirement age of every client profile in a file"
+    )
+    parser.add_argument("input", help="CSV or JSONL file with one profile per row")
+    parser.add_argument("output", help="CSV or Parquet file for the results")
+    parser.add_argument("--input-format", choices=("csv", "jsonl"))
+    parser.add_argument("--output-format", choices=("csv", "parquet"))
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="profiles per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes")
+    parser.add_argument("--quiet", action="store_true", help="no progress reporting")
+    args = parser.parse_args(argv)
+
+    try:
+        input_format = _file_format(args.input, INPUT_FORMATS, args.input_format)
+        output_format = _file_format(args.output, OUTPUT_FORMATS, args.output_format)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.chunk_size < 1 or args.workers < 1:
+        parser.error("--chunk-size and --workers must be positive")
+
+    started = time.perf_counter()
+    rows = invalid = 0
+    writer = ResultWriter(args.output, output_format)
+    try:
+        chunks = read_profiles(args.input, input_format, args.chunk_size)
+        for chunk in process_chunks(chunks, args.workers):
+            writer.write(chunk)
+            rows += len(chunk)
+            invalid += int(chunk["error"].notna().sum())
+            if not args.quiet:
+                elapsed = time.perf_counter() - started
+                print(
+                    f"\r{rows:,} profiles, {rows / elapsed:,.0f} rows/s",
+                    end="",
+                    file=sys.stderr,
+                    flush=True,
+                )
+    except (OSError, ValueError) as error:
+        print(file=sys.stderr)
+        parser.exit(1, f"error: {error}\n")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(
+        f"{rows:,} profiles in {elapsed:.2f} s ({rows / max(elapsed, 1e-9):,.0f} rows/s)",
+        file=sys.stderr,
+    )
+    if invalid:
+        print(f"{invalid:,} invalid profiles, see the error column", file=sys.stderr)
 
 
 if __name__ == "__main__":
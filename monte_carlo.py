@@ -0,0 +1,430 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Distributions of the yearly investment return and inflation draws
+DISTRIBUTIONS = ("normal", "lognormal")
+
+# Percentiles reported for the capital left at death
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Log-spaced capital histogram used to merge percentiles of chunked simulations:
+# bin 0 holds depleted paths, then HISTOGRAM_BINS_PER_DECADE bins per decade
+# from 1 up to 10**HISTOGRAM_DECADES PLN (about 1.2% wide each)
+HISTOGRAM_BINS_PER_DECADE = 200
+HISTOGRAM_DECADES = 14
+
+
+class MonteCarloResult:
+    """
+    Outcome of simulate_retirement.
+
+    Attributes:
+        retirement_ages: candidate retirement ages, current_age .. death_age - 1
+        success_probability: share of paths with capital left at death, per age
+        final_capital_percentiles: array of shape (len(PERCENTILES), ages) with
+            the capital left at death (0 when it ran out), per age
+        paths: number of simulated paths
+    """
+
+    __slots__ = (
+        "retirement_ages",
+        "success_probability",
+        "final_capital_percentiles",
+        "paths",
+        "_inputs",
+        "_growth",
+        "_flows",
+    )
+
+    def __init__(
+        self,
+        retirement_ages,
+        success_probability,
+        final_capital_percentiles,
+        paths,
+        inputs=None,
+        growth=None,
+        flows=None,
+    ):
+        self.retirement_ages = retirement_ages
+        self.success_probability = success_probability
+        self.final_capital_percentiles = final_capital_percentiles
+        self.paths = paths
+        self._inputs = inputs
+        self._growth = growth
+        self._flows = flows
+
+    def retirement_age(self, confidence=0.9):
+        """
+        Earliest retirement age that succeeds on at least `confidence` of the
+        paths, or None.
+        """
+        (ages,) = np.nonzero(self.success_probability >= confidence)
+        return int(self.retirement_ages[ages[0]]) if len(ages) else None
+
+    def without_paths(self):
+        """
+        Copy without the capital paths, which take two (paths, years) float
+        arrays, e.g. about 11 MB for 10,000 paths over 60 years.
+        """
+        return MonteCarloResult(
+            self.retirement_ages, self.success_probability, self.final_capital_percentiles, self.paths
+        )
+
+    def capital_paths(self, retirement_age, rows=slice(None)):
+        """
+        Capital at the end of every year for a single retirement age, as an
+        array of shape (paths, years). Capital that ran out is shown as 0.
+
+        Args:
+            retirement_age: age the plan retires at
+            rows: slice of the paths to evaluate, all of them by default
+
+        Raises:
+            ValueError: if retirement_age is not one of retirement_ages
+        """
+        if self._growth is None:
+            raise ValueError("Capital paths are not kept for this simulation")
+        current_age, contribution, withdrawal, starting_capital = self._inputs
+        accumulation_years = retirement_age - current_age
+        if not len(self.retirement_ages):
+            raise ValueError("The simulation covers no years, death_age is not after current_age")
+        if not 0 <= accumulation_years < len(self.retirement_ages):
+            raise ValueError(
+                f"retirement_age must be between {current_age} and "
+                f"{current_age + len(self.retirement_ages) - 1}, got {retirement_age}"
+            )
+        flows = self._flows[rows, 1:]
+        year = np.arange(1, flows.shape[1] + 1)
+
+        funded = starting_capital + (contribution + withdrawal) * self._flows[
+            rows, accumulation_years : accumulation_years + 1
+        ]
+        retired = year > accumulation_years
+        capital = self._growth[rows] * np.where(
+            retired, funded - withdrawal * flows, starting_capital + contribution * flows
+        )
+        return np.where(retired, np.maximum(capital, 0), capital)
+
+    def capital_percentiles(self, retirement_age, percentiles=PERCENTILES):
+        """
+        Capital paths of a single retirement age reduced to percentile bands.
+
+        Returns:
+            array of shape (len(percentiles), years), the capital at the end
+            of every year
+        """
+        capital = self.capital_paths(retirement_age)
+        if not capital.size:
+            return np.zeros((len(percentiles), capital.shape[1]))
+        return np.percentile(capital, percentiles, axis=0)
+
+
+def simulate_retirement(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    return_volatility=15.0,
+    inflation_volatility=1.5,
+    correlation=0.0,
+    distribution="normal",
+    paths=10_000,
+    seed=None,
+):
+    """
+    Monte Carlo version of calculate_retirement_age: every year draws its own
+    investment return and inflation, and all paths are simulated at once.
+
+    Args:
+        current_age, ..., starting_capital: as in calculate_retirement_age,
+            annual_investment_return and inflation are the mean of the draws
+        return_volatility: standard deviation of the yearly return (in percentage)
+        inflation_volatility: standard deviation of the yearly inflation (in percentage)
+        correlation: correlation between the return and the inflation of a year
+        distribution: one of DISTRIBUTIONS
+        paths: number of simulated paths
+        seed: seed or numpy.random.SeedSequence for reproducible results
+
+    Returns:
+        MonteCarloResult
+    """
+    _check_parameters(
+        retirement_value, return_volatility, inflation_volatility, correlation, distribution
+    )
+
+    years = max(death_age - current_age, 0)
+    rng = np.random.default_rng(seed)
+    growth, indexation = _draw_factors(
+        rng,
+        paths,
+        years,
+        annual_investment_return,
+        inflation,
+        return_volatility,
+        inflation_volatility,
+        correlation,
+        distribution,
+    )
+    return _evaluate_paths(
+        growth,
+        indexation,
+        current_age,
+        monthly_contribution * 12,
+        retirement_value * 12,
+        starting_capital,
+    )
+
+
+def simulate_retirement_parallel(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    return_volatility=15.0,
+    inflation_volatility=1.5,
+    correlation=0.0,
+    distribution="normal",
+    paths=1_000_000,
+    seed=None,
+    workers=None,
+    chunk_size=50_000,
+):
+    """
+    simulate_retirement split into chunks of paths run in a process pool.
+
+    Chunk i always gets the i-th numpy.random.SeedSequence.spawn child of the
+    seed, and chunks only return counts which are summed, so the result is
+    bit-identical for any number of workers. The final capital percentiles are
+    read from merged log-spaced histograms (see HISTOGRAM_BINS_PER_DECADE)
+    instead of the exact paths, which are not kept.
+
+    Args:
+        same as simulate_retirement
+        workers: number of processes, defaults to the number of CPUs;
+            1 runs every chunk in the current process
+        chunk_size: number of paths simulated by one task
+
+    Returns:
+        MonteCarloResult without capital paths
+    """
+    _check_parameters(
+        retirement_value, return_volatility, inflation_volatility, correlation, distribution
+    )
+
+    years = max(death_age - current_age, 0)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    chunk_paths = [min(chunk_size, paths - start) for start in range(0, paths, chunk_size)]
+    tasks = [
+        (
+            child_seed,
+            size,
+            years,
+            (annual_investment_return, inflation, return_volatility, inflation_volatility,
+             correlation, distribution),
+            (monthly_contribution * 12, retirement_value * 12, starting_capital),
+        )
+        for child_seed, size in zip(seed.spawn(len(chunk_paths)), chunk_paths)
+    ]
+
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(tasks) <= 1:
+        chunks = map(_simulate_chunk, tasks)
+        successes, histogram = _merge_chunks(chunks, years)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            successes, histogram = _merge_chunks(executor.map(_simulate_chunk, tasks), years)
+
+    return MonteCarloResult(
+        np.arange(current_age, current_age + years),
+        successes / max(paths, 1),
+        _histogram_percentiles(histogram, PERCENTILES),
+        paths,
+    )
+
+
+def _check_parameters(
+    retirement_value, return_volatility, inflation_volatility, correlation, distribution
+):
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(
+            f"Unknown distribution {distribution!r}, expected one of {DISTRIBUTIONS}"
+        )
+    if retirement_value < 0:
+        raise ValueError("retirement_value must not be negative")
+    # Written so that NaN fails the checks too
+    if not (return_volatility >= 0 and inflation_volatility >= 0):
+        raise ValueError("return_volatility and inflation_volatility must not be negative")
+    if not -1 <= correlation <= 1:
+        raise ValueError("correlation must be between -1 and 1")
+
+
+def _draw_factors(
+    rng,
+    paths,
+    years,
+    annual_investment_return,
+    inflation,
+    return_volatility,
+    inflation_volatility,
+    correlation,
+    distribution,
+):
+    """
+    Draws correlated yearly growth (1 + return) and indexation (1 + inflation)
+    factors, each an array of shape (paths, years).
+    """
+    shocks = rng.standard_normal((2, paths, years))
+    return_shock = shocks[0]
+    inflation_shock = correlation * shocks[0] + np.sqrt(1 - correlation**2) * shocks[1]
+
+    factors = []
+    for mean, volatility, shock in (
+        (annual_investment_return, return_volatility, return_shock),
+        (inflation, inflation_volatility, inflation_shock),
+    ):
+        mean, volatility = 1 + mean / 100, volatility / 100
+        if distribution == "lognormal":
+            # Parameters of the underlying normal with the same mean and deviation
+            sigma = np.sqrt(np.log1p((volatility / mean) ** 2))
+            factor = np.exp(np.log(mean) - sigma**2 / 2 + sigma * shock)
+        else:
+            # A normal draw can lose more than everything, keep the factor positive
+            factor = np.maximum(mean + volatility * shock, 1e-9)
+        factors.append(factor)
+    return factors
+
+
+def _evaluate_paths(growth, indexation, current_age, contribution, withdrawal, starting_capital):
+    """
+    Evaluates every candidate retirement age on every path.
+    """
+    paths, years = growth.shape
+    cumulative_growth, flows = _discount(growth, indexation)
+    final_capital = _final_capital(
+        cumulative_growth, flows, contribution, withdrawal, starting_capital
+    )
+    success_probability = (final_capital > 0).mean(axis=0)
+
+    final_capital = np.maximum(final_capital, 0)
+    if paths and years:
+        final_capital_percentiles = np.percentile(final_capital, PERCENTILES, axis=0)
+    else:
+        final_capital_percentiles = np.zeros((len(PERCENTILES), years))
+
+    return MonteCarloResult(
+        np.arange(current_age, current_age + years),
+        success_probability,
+        final_capital_percentiles,
+        paths,
+        inputs=(current_age, contribution, withdrawal, starting_capital),
+        growth=cumulative_growth,
+        flows=flows,
+    )
+
+
+def _discount(growth, indexation):
+    """
+    Dividing the capital by the cumulative growth turns each contribution and
+    withdrawal into a discounted flow.
+
+    Returns:
+        cumulative_growth: growth from the start until the end of every year
+        flows: flows[:, t] is the sum of the discounted flows of 1 PLN in
+            today's money paid in each of the first t years
+    """
+    paths, years = growth.shape
+    cumulative_growth = np.cumprod(growth, axis=1)
+    price_level = np.ones_like(indexation)
+    np.cumprod(indexation[:, :-1], axis=1, out=price_level[:, 1:])
+
+    flows = np.zeros((paths, years + 1))
+    np.cumsum(price_level / cumulative_growth, axis=1, out=flows[:, 1:])
+    return cumulative_growth, flows
+
+
+def _final_capital(cumulative_growth, flows, contribution, withdrawal, starting_capital):
+    """
+    Capital left at death of every path (rows) and accumulation length (columns).
+
+    Retiring after n years ends with
+    starting_capital + (contribution + withdrawal) * flows[n] - withdrawal * flows[-1]
+    in discounted money. Withdrawals only make it smaller, so it is positive
+    exactly when the capital never ran out.
+    """
+    years = cumulative_growth.shape[1]
+    funded = starting_capital + (contribution + withdrawal) * flows[:, :years]
+    return cumulative_growth[:, -1:] * (funded - withdrawal * flows[:, years:])
+
+
+def _simulate_chunk(task):
+    """
+    Simulates one chunk of simulate_retirement_parallel.
+
+    Returns:
+        successes: number of successful paths per retirement age
+        histogram: final capital histogram of shape (ages, bins)
+    """
+    seed, paths, years, draw_parameters, (contribution, withdrawal, starting_capital) = task
+    growth, indexation = _draw_factors(np.random.default_rng(seed), paths, years, *draw_parameters)
+    cumulative_growth, flows = _discount(growth, indexation)
+    final_capital = _final_capital(
+        cumulative_growth, flows, contribution, withdrawal, starting_capital
+    )
+    return (final_capital > 0).sum(axis=0), _capital_histogram(final_capital)
+
+
+def _merge_chunks(chunks, years):
+    successes = np.zeros(years, dtype=np.int64)
+    histogram = np.zeros((years, _histogram_bins()), dtype=np.int64)
+    for chunk_successes, chunk_histogram in chunks:
+        successes += chunk_successes
+        histogram += chunk_histogram
+    return successes, histogram
+
+
+def _histogram_bins():
+    return HISTOGRAM_DECADES * HISTOGRAM_BINS_PER_DECADE + 1
+
+
+def _capital_histogram(final_capital):
+    """
+    Counts the final capital of every column into the log-spaced bins.
+    """
+    paths, ages = final_capital.shape
+    bins = _histogram_bins()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        position = np.log10(np.maximum(final_capital, 1)) * HISTOGRAM_BINS_PER_DECADE
+    index = np.where(final_capital > 0, np.minimum(position.astype(np.int64) + 1, bins - 1), 0)
+    index += np.arange(ages) * bins
+    return np.bincount(index.ravel(), minlength=ages * bins).reshape(ages, bins)
+
+
+def _histogram_percentiles(histogram, percentiles):
+    """
+    Percentiles of every row of a capital histogram, interpolated within a bin
+    on the logarithmic scale.
+    """
+    ages, bins = histogram.shape
+    result = np.zeros((len(percentiles), ages))
+    totals = histogram.sum(axis=1)
+    cumulative = np.cumsum(histogram, axis=1)
+    for row, percentile in enumerate(percentiles):
+        rank = percentile / 100 * totals
+        # First bin whose cumulative count reaches the rank
+        index = np.minimum((cumulative < rank[:, None]).sum(axis=1), bins - 1)
+        count = histogram[np.arange(ages), index]
+        below = cumulative[np.arange(ages), index] - count
+        share = np.divide(rank - below, count, out=np.zeros(ages), where=count > 0)
+        exponent = (index - 1 + np.clip(share, 0, 1)) / HISTOGRAM_BINS_PER_DECADE
+        result[row] = np.where(index > 0, 10**exponent, 0)
+    return result
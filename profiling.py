@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+# JSONL file the Streamlit apps append their stage timings to in debug mode
+DEBUG_LOG = os.environ.get("EMERYTURA_DEBUG_LOG", "emerytura_timings.jsonl")
+
+# Longest calculation, engine and chart frames, that live mode of the apps
+# accepts before it switches itself off
+LIVE_BUDGET_MS = 10
+
+# Percentiles printed by `python profiling.py`
+PERCENTILES = (50, 90, 99)
+
+
+def debug_enabled(query_params=None):
+    """
+    True if stage timing is requested with EMERYTURA_DEBUG=1 or the ?debug=1
+    query parameter of the page.
+    """
+    if os.environ.get("EMERYTURA_DEBUG", "").lower() in ("1", "true", "yes"):
+        return True
+    return query_params is not None and query_params.get("debug") == "1"
+
+
+class StageTimer:
+    """
+    Wall-clock timings of the stages of one script run.
+
+    Stages may be nested, a stage started inside "compute" is recorded as
+    "compute/<name>". When disabled, stage() does nothing.
+
+    A Streamlit fragment can rerun on its own after the script finished, its
+    stages then belong to a new timer; finished tells the two cases apart.
+    """
+
+    def __init__(self, enabled=True, clock=time.perf_counter):
+        self.enabled = enabled
+        self.finished = False
+        self.records = []
+        self._clock = clock
+        self._stack = []
+        self._started = clock()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        self._stack.append(name)
+        full_name = "/".join(self._stack)
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.records.append((full_name, self._clock() - started))
+            self._stack.pop()
+
+    def timings(self):
+        """
+        Milliseconds per stage, in the order the stages finished.
+        """
+        timings = {}
+        for name, seconds in self.records:
+            timings[name] = timings.get(name, 0) + seconds * 1000
+        return timings
+
+    def total(self):
+        """
+        Milliseconds since the timer was created.
+        """
+        return (self._clock() - self._started) * 1000
+
+    def finish(self):
+        """
+        Marks the end of the script run.
+        """
+        self.finished = True
+
+    def log(self, path=DEBUG_LOG, **context):
+        """
+        Appends the timings and context, e.g. the script name, as one JSON line.
+        """
+        record = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **context,
+            "total_ms": round(self.total(), 3),
+            "stages_ms": {name: round(ms, 3) for name, ms in self.timings().items()},
+        }
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def summarize(path=DEBUG_LOG, percentiles=PERCENTILES):
+    """
+    Aggregates a timings log.
+
+    Returns:
+        dict of stage name to run count and the percentiles in milliseconds,
+        "total" for whole runs and "total[<fragment>]" for reruns of a
+        single fragment
+    """
+    samples = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            total = f"total[{record['fragment']}]" if "fragment" in record else "total"
+            samples.setdefault(total, []).append(record["total_ms"])
+            for name, ms in record["stages_ms"].items():
+                samples.setdefault(name, []).append(ms)
+
+    summary = {}
+    for name, values in samples.items():
+        points = np.percentile(values, percentiles)
+        summary[name] = {"runs": len(values)} | {
+            f"p{percentile}": round(float(point), 3)
+            for percentile, point in zip(percentiles, points)
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Percentiles of the stage timings log")
+    parser.add_argument("path", nargs="?", default=DEBUG_LOG)
+    args = parser.parse_args()
+
+    summary = summarize(args.path)
+    width = max(map(len, summary), default=0)
+    header = "".join(f"{f'p{percentile} ms':>12}" for percentile in PERCENTILES)
+    print(f"{'stage':<{width}} {'runs':>6}{header}")
+    for name, row in summary.items():
+        values = "".join(f"{row[f'p{percentile}']:>12,.1f}" for percentile in PERCENTILES)
+        print(f"{name:<{width}} {row['runs']:>6}{values}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,82 @@
+import math
+import os
+from functools import partial
+
+import numpy as np
+
+from timeline import Timeline
+
+# Engines available to calculate_retirement_age. "loop" is the original
+# year-by-year simulation and is kept as the reference implementation,
+# "closed_form" evaluates every candidate age with geometric-series formulas,
+# "monthly" compounds, contributes, withdraws and indexes every month.
+ENGINES = ("loop", "closed_form", "monthly")
+
+# Default engine, can be overridden per process to compare both engines
+DEFAULT_ENGINE = os.environ.get("EMERYTURA_ENGINE", "closed_form")
+
+# Version of the engines' results, part of every persistent cache key.
+# Bump it whenever a change alters the numbers returned for some inputs.
+ENGINE_VERSION = 1
+
+# Strategies for locating the earliest feasible age in find_retirement_age
+SEARCHES = ("linear", "bisect")
+
+# Retirement age reported by calculate_retirement_age_batch when retiring is impossible
+NO_RETIREMENT = -1
+
+
+class RetirementResult:
+    """
+    Outcome of plan_retirement.
+
+    Attributes:
+        retirement_age: age at which one can retire, or None if impossible
+        capital_after_retirement: capital left at death
+        chart: (retirement_age, funds_depletion_age) of every earlier, failed age
+        timeline: Timeline of the returned retirement age, built on first access
+    """
+
+    __slots__ = (
+        "retirement_age",
+        "capital_after_retirement",
+        "chart",
+        "_timeline",
+        "_build_timeline",
+    )
+
+    def __init__(
+        self, retirement_age, capital_after_retirement, chart, timeline=None, build_timeline=None
+    ):
+        self.retirement_age = retirement_age
+        self.capital_after_retirement = capital_after_retirement
+        self.chart = chart
+        self._timeline = timeline
+        self._build_timeline = build_timeline
+
+    @property
+    def timeline(self):
+        if self._timeline is None and self._build_timeline is not None:
+            self._timeline = self._build_timeline()
+            self._build_timeline = None
+        return self._timeline
+
+    def as_tuple(self):
+        """
+        Returns the five-tuple of calculate_retirement_age.
+        """
+        if self.retirement_age is None:
+            return None, None, None, None, None
+        capital_timeline, cost_timeline = self.timeline.to_records()
+        return (
+            self.retirement_age,
+            self.capital_after_retirement,
+            self.chart,
+            capital_timeline,
+            cost_timeline,
+        )
+
+
 def calculate_retirement_age(
     current_age,
     monthly_contribution,
@@ -6,6 +85,7 @@ def calculate_retirement_age(
     inflation,
     retirement_value,
     starting_capital,
+    engine=None,
 ):
     """
     Calculates the age at which one can retire.
@@ -18,72 +98,743 @@ def calculate_retirement_age(
         inflation: annual inflation (in percentage, e.g., 3 for 3%)
         retirement_value: monthly retirement value (in today's money)
         starting_capital: initial capital
+        engine: one of ENGINES, defaults to DEFAULT_ENGINE
 
     Returns:
         retirement_age: age at which one can retire, or None if impossible
     """
+    engine = _resolve_engine(engine)
+    inputs = (
+        current_age,
+        monthly_contribution,
+        annual_investment_return,
+        death_age,
+        inflation,
+        retirement_value,
+        starting_capital,
+    )
+    return plan_retirement(*inputs, engine=engine).as_tuple()
+
+
+def plan_retirement(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    engine=None,
+):
+    """
+    Same as calculate_retirement_age, but the timelines are returned as a
+    single columnar Timeline instead of lists of dicts.
+
+    Only scalar balances are computed while searching for the retirement age.
+    The timeline of the returned age is built when it is first accessed.
+
+    Returns:
+        RetirementResult
+    """
+    engine = _resolve_engine(engine)
+    inputs = (
+        current_age,
+        monthly_contribution,
+        annual_investment_return,
+        death_age,
+        inflation,
+        retirement_value,
+        starting_capital,
+    )
+    if engine == "closed_form" and _closed_form_applicable(*inputs):
+        return _plan_closed_form(*inputs)
+    if engine == "monthly" and _closed_form_applicable(*inputs):
+        return _plan_monthly(*inputs)
+    return _plan_loop(*inputs)
+
+
+def find_retirement_age(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    engine=None,
+    search="bisect",
+):
+    """
+    Finds the earliest retirement age without building the scenario chart and
+    the timelines, which is all that parameter sweeps need. The monthly
+    engine evaluates every candidate in one vectorized pass and is not
+    searched.
+
+    The scenario chart of calculate_retirement_age needs every earlier age
+    anyway, so only this function can skip candidates. With search="bisect"
+    the age is found in O(log N) evaluations: retiring a year later turns a
+    withdrawal into a contribution, so feasibility only grows with the
+    retirement age as long as contributions plus withdrawals are non-negative
+    and returns and inflation stay above -100%. Other inputs are scanned
+    linearly.
+
+    Args:
+        same as calculate_retirement_age
+        search: one of SEARCHES
+
+    Returns:
+        retirement_age, capital_after_retirement: or None, None if impossible
+    """
+    engine = _resolve_engine(engine)
+    if search not in SEARCHES:
+        raise ValueError(f"Unknown search {search!r}, expected one of {SEARCHES}")
+
+    inputs = (
+        current_age,
+        monthly_contribution,
+        annual_investment_return,
+        death_age,
+        inflation,
+        retirement_value,
+        starting_capital,
+    )
+    if engine == "monthly" and _closed_form_applicable(*inputs):
+        # All candidates are evaluated together anyway
+        result = _plan_monthly(*inputs)
+        return result.retirement_age, result.capital_after_retirement
+    if engine == "closed_form" and _closed_form_applicable(*inputs):
+        final_capital = _closed_form_final_capital
+    else:
+        final_capital = _loop_final_capital
+
+    if search == "bisect" and _feasibility_monotonic(*inputs):
+        return _bisect_retirement_age(final_capital, inputs)
+
+    for retirement_age in range(current_age, death_age):
+        capital_after_retirement = final_capital(*inputs, retirement_age)
+        if capital_after_retirement > 0:
+            return retirement_age, capital_after_retirement
+    return None, None
+
+
+def calculate_retirement_age_batch(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    timelines=False,
+    chunk_size=4096,
+):
+    """
+    Calculates the retirement age of many profiles at once.
+
+    Every profile is evaluated with the closed-form engine, broadcast over
+    profiles and candidate ages with NumPy. Profiles outside the closed
+    form's assumptions are handed to find_retirement_age one by one.
+
+    Args:
+        current_age, ..., starting_capital: equal-length arrays with the
+            inputs of calculate_retirement_age, one element per profile
+        timelines: also return the yearly capital and monthly cost
+        chunk_size: number of profiles evaluated together, bounds memory use
 
+    Returns:
+        retirement_age: int array, NO_RETIREMENT where retiring is impossible
+        capital_after_retirement: float array, NaN where retiring is impossible
+        capital, monthly_cost: only with timelines=True, float arrays of shape
+            (profiles, years) where column j is the age current_age + j + 1,
+            padded with NaN after death_age and for impossible profiles
+    """
+    current_age = np.asarray(current_age, dtype=np.int64)
+    death_age = np.asarray(death_age, dtype=np.int64)
+    inputs = [
+        current_age,
+        np.asarray(monthly_contribution, dtype=float),
+        np.asarray(annual_investment_return, dtype=float),
+        death_age,
+        np.asarray(inflation, dtype=float),
+        np.asarray(retirement_value, dtype=float),
+        np.asarray(starting_capital, dtype=float),
+    ]
+    profiles = len(current_age)
+    if any(values.shape != (profiles,) for values in inputs):
+        raise ValueError("All inputs must be one-dimensional arrays of equal length")
+
+    retirement_age = np.full(profiles, NO_RETIREMENT, dtype=np.int64)
+    capital_after_retirement = np.full(profiles, np.nan)
+    years = int(np.max(death_age - current_age, initial=0))
+    if timelines:
+        capital = np.full((profiles, years), np.nan)
+        monthly_cost = np.full((profiles, years), np.nan)
+
+    for start in range(0, profiles, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        result = _batch_chunk(*(values[chunk] for values in inputs), timelines)
+        retirement_age[chunk], capital_after_retirement[chunk] = result[:2]
+        if timelines:
+            width = result[2].shape[1]
+            capital[chunk, :width], monthly_cost[chunk, :width] = result[2:]
+
+    # Inputs the closed form does not cover, e.g. a return of -100%
+    (unsupported,) = np.nonzero(
+        (inputs[2] <= -100) | (inputs[4] <= -100) | (inputs[5] < 0)
+    )
+    for index in unsupported:
+        profile = [values[index].item() for values in inputs]
+        if timelines:
+            result = _plan_loop(*profile)
+            age, final = result.retirement_age, result.capital_after_retirement
+            capital[index] = monthly_cost[index] = np.nan
+            if age is not None:
+                width = len(result.timeline)
+                capital[index, :width] = result.timeline.capital
+                monthly_cost[index, :width] = result.timeline.monthly_cost
+        else:
+            age, final = find_retirement_age(*profile, engine="loop")
+        retirement_age[index] = NO_RETIREMENT if age is None else age
+        capital_after_retirement[index] = np.nan if age is None else final
+
+    if timelines:
+        return retirement_age, capital_after_retirement, capital, monthly_cost
+    return retirement_age, capital_after_retirement
+
+
+def _resolve_engine(engine):
+    engine = engine or DEFAULT_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    return engine
+
+
+def _feasibility_monotonic(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+):
+    """
+    True if a later retirement age can never turn a feasible plan infeasible.
+    """
+    return (
+        monthly_contribution + retirement_value >= 0
+        and annual_investment_return > -100
+        and inflation > -100
+    )
+
+
+def _bisect_retirement_age(final_capital, inputs):
+    """
+    Bisection over [current_age, death_age) for the first age with positive
+    capital left at death.
+    """
+    current_age, death_age = inputs[0], inputs[3]
+    if current_age >= death_age:
+        return None, None
+
+    low, high = current_age, death_age - 1
+    capital_after_retirement = final_capital(*inputs, high)
+    if not capital_after_retirement > 0:
+        return None, None
+
+    while low < high:
+        middle = (low + high) // 2
+        middle_capital = final_capital(*inputs, middle)
+        if middle_capital > 0:
+            high, capital_after_retirement = middle, middle_capital
+        else:
+            low = middle + 1
+    return high, capital_after_retirement
+
+
+def _plan_loop(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+):
+    """
+    Reference engine: simulates both phases year by year for every candidate
+    age, keeping only the scalar balances. The timeline of the returned age
+    is simulated again on demand.
+    """
+    inputs = (
+        current_age,
+        monthly_contribution,
+        annual_investment_return,
+        death_age,
+        inflation,
+        retirement_value,
+        starting_capital,
+    )
+    chart = []
+
+    # Check each possible retirement age
+    for retirement_age in range(current_age, death_age):
+        capital_after_retirement, depletion_age = _loop_balance(*inputs, retirement_age)
+        if capital_after_retirement > 0:
+            return RetirementResult(
+                retirement_age,
+                capital_after_retirement,
+                chart,
+                build_timeline=partial(_loop_timeline, *inputs, retirement_age),
+            )
+        if depletion_age is not None:
+            chart.append((retirement_age, depletion_age))
+
+    return RetirementResult(None, None, None)  # Impossible to retire with given parameters
+
+
+def _loop_balance(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    retirement_age,
+):
+    """
+    Simulates a single retirement age year by year.
+
+    Returns:
+        capital_after_retirement: capital left at death, negative if the
+            capital runs out earlier
+        depletion_age: age at which the capital runs out, or None
+    """
     # Convert percentages to decimal values
     return_rate = annual_investment_return / 100
     inflation_dec = inflation / 100
+    capital = starting_capital
+
+    # Accumulation phase (until retirement age)
+    accumulation_years = retirement_age - current_age
+    for year in range(accumulation_years):
+        # Contributions accounting for inflation
+        annual_contribution = monthly_contribution * 12 * ((1 + inflation_dec) ** year)
+        capital = capital * (1 + return_rate) + annual_contribution
+
+    # Retirement phase (from retirement age to death)
+    for year in range(death_age - retirement_age):
+        # Retirement withdrawal accounting for inflation
+        annual_withdrawal = (
+            retirement_value * 12 * ((1 + inflation_dec) ** (accumulation_years + year))
+        )
+        capital = capital * (1 + return_rate) - annual_withdrawal
+        # If capital falls below zero, this retirement age is not possible
+        if capital < 0:
+            return capital, retirement_age + year
+
+    return capital, None
+
+
+def _loop_final_capital(*inputs):
+    return _loop_balance(*inputs)[0]
+
+
+def _loop_timeline(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    retirement_age,
+):
+    """
+    Builds the timeline of a single retirement age with the arithmetic of
+    _loop_balance.
+    """
+    return_rate = annual_investment_return / 100
+    inflation_dec = inflation / 100
+    accumulation_years = retirement_age - current_age
+    total_years = death_age - current_age
+    capital_timeline = np.empty(total_years)
+    cost_timeline = np.empty(total_years)
+
+    capital = starting_capital
+    for year in range(accumulation_years):
+        annual_contribution = monthly_contribution * 12 * ((1 + inflation_dec) ** year)
+        capital = capital * (1 + return_rate) + annual_contribution
+        capital_timeline[year] = capital
+        # Monthly costs during accumulation (retirement_value adjusted for inflation)
+        cost_timeline[year] = retirement_value * ((1 + inflation_dec) ** year)
+
+    for year in range(accumulation_years, total_years):
+        annual_withdrawal = retirement_value * 12 * ((1 + inflation_dec) ** year)
+        capital = capital * (1 + return_rate) - annual_withdrawal
+        capital_timeline[year] = max(0, capital)  # Don't show negative capital
+        cost_timeline[year] = annual_withdrawal / 12
+
+    ages = np.arange(current_age + 1, death_age + 1)
+    return Timeline(ages, capital_timeline, cost_timeline, accumulation_years)
+
+
+def _closed_form_final_capital(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    retirement_age,
+):
+    """
+    Capital left at death for a single retirement age, in O(1).
+    """
+    growth = 1 + annual_investment_return / 100
+    indexation = 1 + inflation / 100
+    withdrawal = retirement_value * 12
+    total_years = death_age - current_age
+
+    funded = starting_capital + (monthly_contribution * 12 + withdrawal) * _discounted_flows(
+        growth, indexation, retirement_age - current_age
+    )
+    total_withdrawals = withdrawal * _discounted_flows(growth, indexation, total_years)
+    return growth**total_years * (funded - total_withdrawals)
+
+
+def _discounted_flows(growth, indexation, years):
+    """
+    Value at the start of `years` yearly flows of 1 indexed with inflation.
+
+    It is the geometric series sum(indexation**s / growth**(s + 1)) for
+    s in range(years). Both the contributions and the withdrawals of the
+    loop engine are such flows, which lets every candidate be evaluated in O(1).
+    """
+    if years <= 0:
+        return 0.0
+    if abs(growth - indexation) < 1e-9:
+        return years / growth
+    return (1 - (indexation / growth) ** years) / (growth - indexation)
+
+
+def _closed_form_applicable(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+):
+    """
+    The closed form assumes positive growth and indexation factors and
+    non-negative withdrawals, so that capital never recovers once it is
+    depleted. Other inputs are left to the loop engine.
+    """
+    return annual_investment_return > -100 and inflation > -100 and retirement_value >= 0
+
+
+def _depletion_year(funded, withdrawal, growth, indexation, first, last):
+    """
+    Returns the first year t in [first, last] in which the discounted capital
+    funded - withdrawal * _discounted_flows(t) drops below zero, or None.
+    """
+
+    def depleted(t):
+        return funded - withdrawal * _discounted_flows(growth, indexation, t) < 0
+
+    if funded < 0:
+        return first
+    if withdrawal == 0:
+        return None
+
+    # Solve funded = withdrawal * _discounted_flows(t) for t
+    target = funded / withdrawal
+    if abs(growth - indexation) < 1e-9:
+        bound = target * growth
+    elif growth > indexation:
+        remaining = 1 - target * (growth - indexation)
+        if remaining <= 0:
+            return None
+        bound = math.log(remaining) / math.log(indexation / growth)
+    else:
+        bound = math.log(1 + target * (indexation - growth)) / math.log(indexation / growth)
+
+    t = max(first, min(math.floor(bound) + 1, last + 1))
+    # Correct the rounding of the logarithms against the exact balance
+    while t > first and depleted(t - 1):
+        t -= 1
+    while t <= last and not depleted(t):
+        t += 1
+    return t if t <= last else None
+
+
+def _plan_closed_form(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+):
+    """
+    Closed-form engine: the same model as _plan_loop, but the capital at
+    retirement and at death is computed with geometric series, so every
+    candidate age costs O(1).
+    """
+    growth = 1 + annual_investment_return / 100
+    indexation = 1 + inflation / 100
+    contribution = monthly_contribution * 12
+    withdrawal = retirement_value * 12
+    total_years = death_age - current_age
     chart = []
 
-    # Check each possible retirement age
-    for retirement_age in range(current_age, death_age):
-        capital = starting_capital
-        current_timeline = []  # Track capital for this retirement scenario
-        cost_timeline = []  # Track monthly costs over time
+    # Discounted value of all withdrawals until death
+    total_withdrawals = withdrawal * _discounted_flows(growth, indexation, total_years)
 
-        # Accumulation phase (until retirement age)
+    for retirement_age in range(current_age, death_age):
         accumulation_years = retirement_age - current_age
-        for year in range(accumulation_years):
-            # Contributions accounting for inflation
-            annual_contribution = monthly_contribution * 12 * ((1 + inflation_dec) ** year)
-            capital = capital * (1 + return_rate) + annual_contribution
-            current_timeline.append({
-                'age': current_age + year + 1,
-                'capital': capital,
-                'phase': 'Accumulation'
-            })
-            # Track monthly costs during accumulation (assumed to be retirement_value adjusted for inflation)
-            monthly_cost_inflated = retirement_value * ((1 + inflation_dec) ** year)
-            cost_timeline.append({
-                'age': current_age + year + 1,
-                'monthly_cost': monthly_cost_inflated,
-                'phase': 'Accumulation'
-            })
-
-        # Retirement phase (from retirement age to death)
-        retirement_years = death_age - retirement_age
-        capital_after_retirement = capital
-
-        for year in range(retirement_years):
-            # Retirement withdrawal accounting for inflation
-            annual_withdrawal = (
-                retirement_value * 12 * ((1 + inflation_dec) ** (accumulation_years + year))
-            )
-            monthly_withdrawal = annual_withdrawal / 12
-            capital_after_retirement = capital_after_retirement * (1 + return_rate) - annual_withdrawal
-            current_timeline.append({
-                'age': retirement_age + year + 1,
-                'capital': max(0, capital_after_retirement),  # Don't show negative capital
-                'phase': 'Retirement'
-            })
-            cost_timeline.append({
-                'age': retirement_age + year + 1,
-                'monthly_cost': monthly_withdrawal,
-                'phase': 'Retirement'
-            })
-
-            # If capital falls below zero, this retirement age is not possible
-            if capital_after_retirement < 0:
-                chart.append((retirement_age, retirement_age + year))
-                break
-        
+        # Discounted capital available at retirement, plus the withdrawals
+        # which are not needed before retirement
+        funded = starting_capital + (contribution + withdrawal) * _discounted_flows(
+            growth, indexation, accumulation_years
+        )
+        capital_after_retirement = growth**total_years * (funded - total_withdrawals)
+
         if capital_after_retirement > 0:
-            return retirement_age, capital_after_retirement, chart, current_timeline, cost_timeline
+            build_timeline = partial(
+                _closed_form_timeline,
+                current_age, retirement_age, death_age, growth, indexation,
+                contribution, withdrawal, retirement_value, starting_capital, funded,
+            )
+            return RetirementResult(
+                retirement_age, capital_after_retirement, chart, build_timeline=build_timeline
+            )
+
+        depletion = _depletion_year(
+            funded, withdrawal, growth, indexation, accumulation_years + 1, total_years
+        )
+        if depletion is not None:
+            chart.append((retirement_age, current_age + depletion - 1))
+
+    return RetirementResult(None, None, None)
+
+
+def _closed_form_timeline(
+    current_age,
+    retirement_age,
+    death_age,
+    growth,
+    indexation,
+    contribution,
+    withdrawal,
+    retirement_value,
+    starting_capital,
+    funded,
+):
+    """
+    Builds the timeline of a single retirement age.
+    """
+    accumulation_years = retirement_age - current_age
+    year = np.arange(1, death_age - current_age + 1)
+    flows = _batch_discounted_flows(growth, indexation, year)
+    retired = year > accumulation_years
+
+    capital = growth**year * np.where(
+        retired, funded - withdrawal * flows, starting_capital + contribution * flows
+    )
+    capital[retired] = np.maximum(capital[retired], 0)  # Don't show negative capital
+    monthly_cost = retirement_value * indexation ** (year - 1)
+    return Timeline(current_age + year, capital, monthly_cost, accumulation_years)
+
+
+def _monthly_rates(annual_investment_return, inflation):
+    """
+    Monthly growth and indexation factors equivalent to the annual rates.
+    """
+    return (1 + annual_investment_return / 100) ** (1 / 12), (1 + inflation / 100) ** (1 / 12)
+
+
+def _monthly_discounted_flows(growth, indexation, months):
+    """
+    Monthly counterpart of _discounted_flows for every horizon at once.
+
+    Returns:
+        flows: flows[t] is the value at the start of t monthly flows of 1,
+            for t in range(months + 1)
+        compounding: compounding[m] is growth**(m + 1)
+        indexed: indexed[m] is indexation**m
+    """
+    compounding = np.cumprod(np.full(months, growth))
+    indexed = np.cumprod(np.full(months, indexation)) / indexation
+    flows = np.zeros(months + 1)
+    np.cumsum(indexed / compounding, out=flows[1:])
+    return flows, compounding, indexed
+
+
+def _plan_monthly(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+):
+    """
+    Monthly engine: the model of _plan_closed_form with a monthly time step.
+    Capital compounds every month, the contribution is paid and the
+    retirement value withdrawn every month, and both are indexed with
+    inflation every month.
+
+    The discounted flows of all months come from cumulative products and
+    sums, so every candidate age and its depletion age are evaluated at once.
+    Retirement ages stay whole years.
+    """
+    growth, indexation = _monthly_rates(annual_investment_return, inflation)
+    total_years = death_age - current_age
+    if total_years <= 0:
+        return RetirementResult(None, None, None)
+    flows, compounding, indexed = _monthly_discounted_flows(growth, indexation, total_years * 12)
+
+    # Discounted capital available at retirement after n years, plus the
+    # withdrawals which are not needed before retirement
+    accumulation_years = np.arange(total_years)
+    funded = starting_capital + (monthly_contribution + retirement_value) * flows[
+        accumulation_years * 12
+    ]
+    capital_after_retirement = compounding[-1] * (funded - retirement_value * flows[-1])
+
+    feasible = capital_after_retirement > 0
+    retired_after = int(np.argmax(feasible)) if feasible.any() else total_years
+
+    # First month whose withdrawal leaves less than nothing, for failed candidates
+    failed = accumulation_years[:retired_after]
+    months = np.searchsorted(retirement_value * flows, funded[:retired_after], side="right")
+    months = np.maximum(months, failed * 12 + 1)
+    depleted = months <= total_years * 12
+    chart = [
+        (current_age + int(years), current_age + int(month - 1) // 12)
+        for years, month in zip(failed[depleted], months[depleted])
+    ]
+
+    if retired_after == total_years:
+        return RetirementResult(None, None, None)
+
+    build_timeline = partial(
+        _monthly_timeline,
+        current_age, retired_after, monthly_contribution, retirement_value,
+        starting_capital, compounding, indexed,
+    )
+    return RetirementResult(
+        current_age + retired_after,
+        float(capital_after_retirement[retired_after]),
+        chart,
+        build_timeline=build_timeline,
+    )
+
+
+def _monthly_timeline(
+    current_age,
+    accumulation_years,
+    monthly_contribution,
+    retirement_value,
+    starting_capital,
+    compounding,
+    indexed,
+):
+    """
+    Builds the yearly timeline of the monthly engine: capital at the end of
+    every year and the monthly cost in its first month, the points the
+    yearly engines report.
+    """
+    months = len(compounding)
+    retired = np.arange(months) >= accumulation_years * 12
+    flows = np.where(retired, -retirement_value, monthly_contribution) * indexed
+    capital = compounding * (starting_capital + np.cumsum(flows / compounding))
+
+    capital = capital[11::12]
+    year_retired = retired[11::12]
+    capital[year_retired] = np.maximum(capital[year_retired], 0)  # Don't show negative capital
+    monthly_cost = retirement_value * indexed[::12]
+    ages = np.arange(current_age + 1, current_age + months // 12 + 1)
+    return Timeline(ages, capital, monthly_cost, accumulation_years)
+
+
+def _batch_discounted_flows(growth, indexation, years):
+    """
+    _discounted_flows broadcast over arrays.
+    """
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        gap = growth - indexation
+        equal = np.abs(gap) < 1e-9
+        flows = (1 - (indexation / growth) ** years) / np.where(equal, 1, gap)
+        return np.where(equal, years / growth, flows)
+
+
+def _batch_chunk(
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    timelines,
+):
+    """
+    Closed-form engine for a chunk of profiles. Profiles are rows, candidate
+    accumulation years (and timeline years) are columns.
+    """
+    total_years = np.maximum(death_age - current_age, 0)
+    years = int(np.max(total_years, initial=0))
+    growth = (1 + annual_investment_return / 100)[:, None]
+    indexation = (1 + inflation / 100)[:, None]
+    contribution = (monthly_contribution * 12)[:, None]
+    withdrawal = (retirement_value * 12)[:, None]
+    starting_capital = starting_capital[:, None]
+
+    # flows[p, t] is _discounted_flows for t = 0..years
+    flows = _batch_discounted_flows(growth, indexation, np.arange(years + 1))
+    total_flows = np.take_along_axis(flows, total_years[:, None], axis=1)
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        funded = starting_capital + (contribution + withdrawal) * flows[:, :years]
+        final = growth ** total_years[:, None] * (funded - withdrawal * total_flows)
+    candidates = np.arange(years) < total_years[:, None]
+    feasible = candidates & (final > 0)
+
+    possible = feasible.any(axis=1)
+    accumulation_years = feasible.argmax(axis=1)
+    rows = np.arange(len(current_age))
+    retirement_age = np.where(possible, current_age + accumulation_years, NO_RETIREMENT)
+    capital_after_retirement = np.where(possible, final[rows, accumulation_years], np.nan)
+    if not timelines:
+        return retirement_age, capital_after_retirement
 
-    return None, None, None, None, None  # Impossible to retire with given parameters
+    # Column j holds the year j + 1 of the chosen plan
+    year = np.arange(1, years + 1)
+    retired = year > accumulation_years[:, None]
+    with np.errstate(over="ignore", invalid="ignore"):
+        discounted = np.where(
+            retired,
+            funded[rows, accumulation_years][:, None] - withdrawal * flows[:, 1:],
+            starting_capital + contribution * flows[:, 1:],
+        )
+        capital = growth**year * discounted
+        capital = np.where(retired, np.maximum(capital, 0), capital)
+        monthly_cost = retirement_value[:, None] * indexation ** (year - 1)
+    shown = possible[:, None] & (year <= total_years[:, None])
+    return (
+        retirement_age,
+        capital_after_retirement,
+        np.where(shown, capital, np.nan),
+        np.where(shown, monthly_cost, np.nan),
+    )
 
 
 # # Example usage
@@ -0,0 +1,405 @@
+import argparse
+import json
+import math
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import numpy as np
+
+import export
+from cache import ResultCache, normalize_inputs
+from inputs import INPUT_ORDER, validate_inputs
+from lookup_grid import LookupGrid
+from monte_carlo import simulate_retirement
+from retirement_calc import NO_RETIREMENT, calculate_retirement_age_batch, plan_retirement
+
+# Largest accepted request body and batch
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_BATCH_PROFILES = 100_000
+# Most paths of an exported Monte Carlo simulation, as in the app
+MAX_SIMULATION_PATHS = 100_000
+# Error of results that JSON cannot carry
+OVERFLOW_ERROR = "The capital exceeds the range of floating point numbers, the inputs are too large"
+
+# Tables of POST /retirement/export, as functions of a RetirementResult
+EXPORT_TABLES = {
+    "capital": lambda result: export.capital_columns(result.timeline),
+    "cost": lambda result: export.cost_columns(result.timeline),
+    "scenarios": export.scenario_columns,
+}
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-profile requests into one
+    calculate_retirement_age_batch call.
+
+    A batch is computed as soon as max_batch_size requests are waiting, or
+    max_wait seconds after its first request arrived.
+    """
+
+    def __init__(self, max_batch_size=256, max_wait=0.002):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, inputs):
+        """
+        Returns the (retirement_age, capital_after_retirement) of inputs,
+        blocking until its batch is computed.
+        """
+        future = Future()
+        self._queue.put((inputs, future))
+        return future.result()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "average_batch_size": self.requests / max(self.batches, 1),
+        }
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(pending) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            try:
+                columns = zip(*(inputs for inputs, _ in pending))
+                ages, capitals = calculate_retirement_age_batch(*map(np.asarray, columns))
+            except Exception as error:
+                for _, future in pending:
+                    future.set_exception(error)
+                continue
+            self.batches += 1
+            self.requests += len(pending)
+            for (_, future), age, capital in zip(pending, ages.tolist(), capitals.tolist()):
+                try:
+                    future.set_result(_age_and_capital(age, capital))
+                except ValueError as error:
+                    future.set_exception(error)
+
+
+class RetirementServer(ThreadingHTTPServer):
+    """
+    HTTP server holding the cache and the micro-batcher shared by all
+    request threads.
+
+    Args:
+        lookup_grid: path of a grid built by lookup_grid.py, which then
+            answers /retirement without details instead of the micro-batcher
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, cache_size=4096, cache_ttl=3600, batch_size=256, batch_wait=0.002,
+                 verbose=False, lookup_grid=None):
+        super().__init__(address, RetirementHandler)
+        self.cache = ResultCache(max_size=cache_size, ttl=cache_ttl)
+        self.batcher = MicroBatcher(batch_size, batch_wait)
+        self.lookup_grid = None if lookup_grid is None else LookupGrid.load(lookup_grid)
+        self.verbose = verbose
+
+
+class RetirementHandler(BaseHTTPRequestHandler):
+    """
+    JSON API:
+
+    GET  /health              -> {"status": "ok"}
+    GET  /stats               -> cache, micro-batching and lookup grid counters
+    POST /retirement          -> {"retirement_age", "capital_after_retirement"}
+         from the lookup grid if the server has one, with ?details=1 also
+         "chart" and "timeline"
+    POST /retirement/batch    {"profiles": [...]} -> {"results": [...]}
+
+    File exports, ?format= csv (default), parquet or xlsx:
+
+    POST /retirement/export?table=capital|cost|scenarios
+         profile -> the table of its plan
+    POST /retirement/batch/export    {"profiles": [...]}
+         -> the inputs, retirement age and capital of every profile
+    POST /retirement/simulation/export?retirement_age=...
+         profile -> one row of capital per Monte Carlo path, with the
+         paths, seed, return_volatility, inflation_volatility and
+         correlation of simulate_retirement as further parameters
+
+    Profiles are objects with the arguments of calculate_retirement_age,
+    validated against the limits of the sidebar widgets.
+
+    Exports are sent with chunked transfer encoding while they are encoded,
+    one chunk of rows at a time, so a large file is never held in memory.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/health":
+            self._send(200, {"status": "ok"})
+        elif path == "/stats":
+            stats = {"cache": self.server.cache.stats(), "batching": self.server.batcher.stats()}
+            grid = self.server.lookup_grid
+            if grid is not None:
+                stats["lookup_grid"] = {"grid_hits": grid.grid_hits, "recomputed": grid.recomputed}
+            self._send(200, stats)
+        else:
+            self._send(404, {"error": f"Unknown path {path}"})
+
+    def do_POST(self):
+        path, _, query = self.path.partition("?")
+        try:
+            body = self._read_json()
+            if path == "/retirement":
+                self._send(200, self._retirement(body, details="details=1" in query.split("&")))
+            elif path == "/retirement/batch":
+                self._send(200, self._batch(body))
+            elif path == "/retirement/export":
+                self._send_file(*self._export(body, parse_qs(query)))
+            elif path == "/retirement/batch/export":
+                self._send_file(*self._batch_export(body, parse_qs(query)))
+            elif path == "/retirement/simulation/export":
+                self._send_file(*self._simulation_export(body, parse_qs(query)))
+            else:
+                self._send(404, {"error": f"Unknown path {path}"})
+        except ValueError as error:
+            self._send(400, {"error": str(error)})
+        except OverflowError:
+            self._send(400, {"error": OVERFLOW_ERROR})
+
+    def _retirement(self, body, details):
+        inputs = normalize_inputs(*_validate(body))
+        cache = self.server.cache
+        grid = self.server.lookup_grid
+        if not details and grid is not None:
+            return cache.get_or_compute(("age",) + inputs, lambda: _age_and_capital(*grid.plan(*inputs)))
+        if not details:
+            return cache.get_or_compute(("age",) + inputs, lambda: self.server.batcher.submit(inputs))
+        return cache.get_or_compute(("details",) + inputs, lambda: _details(inputs))
+
+    def _batch(self, body):
+        rows = _validate_batch(body)
+        if not rows:
+            return {"results": []}
+        ages, capitals = calculate_retirement_age_batch(*map(np.asarray, zip(*rows)))
+        results = []
+        for index, (age, capital) in enumerate(zip(ages.tolist(), capitals.tolist())):
+            try:
+                results.append(_age_and_capital(age, capital))
+            except ValueError as error:
+                raise ValueError(f"Profile {index}: {error}") from None
+        return {"results": results}
+
+    def _export(self, body, query):
+        file_format = _export_format(query)
+        table = _parameter(query, "table", str, "capital")
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Unknown table {table}, use one of {', '.join(EXPORT_TABLES)}")
+        inputs = normalize_inputs(*_validate(body))
+        result = self.server.cache.get_or_compute(("plan",) + inputs, lambda: plan_retirement(*inputs))
+        if result.timeline is None and table != "scenarios":
+            raise ValueError("Retiring is impossible with this profile, there is no timeline")
+        return file_format, export.chunked(EXPORT_TABLES[table](result)), table
+
+    def _batch_export(self, body, query):
+        file_format = _export_format(query)
+        rows = _validate_batch(body)
+        columns = map(np.asarray, zip(*rows)) if rows else [np.empty(0)] * len(INPUT_ORDER)
+        profiles = dict(zip(INPUT_ORDER, columns))
+        return file_format, export.batch_chunks(profiles), "batch"
+
+    def _simulation_export(self, body, query):
+        file_format = _export_format(query)
+        inputs = _validate(body)
+        retirement_age = _parameter(query, "retirement_age", int)
+        paths = _parameter(query, "paths", int, 10_000)
+        if not 1 <= paths <= MAX_SIMULATION_PATHS:
+            raise ValueError(f"paths must be between 1 and {MAX_SIMULATION_PATHS}")
+        options = {
+            name: _parameter(query, name, float, default)
+            for name, default in (("return_volatility", 15.0), ("inflation_volatility", 1.5), ("correlation", 0.0))
+        }
+        simulation = simulate_retirement(
+            *inputs, **options, paths=paths, seed=_parameter(query, "seed", int, None)
+        )
+        if retirement_age not in simulation.retirement_ages:
+            raise ValueError(
+                f"retirement_age must be between {inputs[0]} and {simulation.retirement_ages[-1]}"
+            )
+        return file_format, export.simulation_chunks(simulation, retirement_age), "simulation"
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The end of the body is unknown, the connection can't be reused
+            self.close_connection = True
+            raise ValueError(f"Invalid Content-Length {self.headers.get('Content-Length')}")
+        if length > MAX_BODY_BYTES:
+            raise ValueError(f"Request body larger than {MAX_BODY_BYTES} bytes")
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except json.JSONDecodeError as error:
+            raise ValueError(f"Invalid JSON: {error}") from None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, allow_nan=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, file_format, chunks, name):
+        mime, extension = export.FORMATS[file_format]
+        self.send_response(200)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Disposition", f'attachment; filename="{name}.{extension}"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for data in export.stream(chunks, file_format):
+                if data:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        except Exception:
+            # The status is already sent, so no error response can follow.
+            # A connection closed without the last chunk tells the client
+            # the file is incomplete.
+            self.server.handle_error(self.request, self.client_address)
+            self.close_connection = True
+            return
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def _validate(profile):
+    if not isinstance(profile, dict):
+        raise ValueError(f"Expected an object with {', '.join(INPUT_ORDER)}")
+    return validate_inputs(profile)
+
+
+# Default of a query parameter that must be given
+_REQUIRED = object()
+
+
+def _validate_batch(body):
+    profiles = body.get("profiles") if isinstance(body, dict) else None
+    if not isinstance(profiles, list):
+        raise ValueError("Expected an object with a list of profiles")
+    if len(profiles) > MAX_BATCH_PROFILES:
+        raise ValueError(f"At most {MAX_BATCH_PROFILES} profiles per batch")
+
+    rows = []
+    for index, profile in enumerate(profiles):
+        try:
+            rows.append(_validate(profile))
+        except ValueError as error:
+            raise ValueError(f"Profile {index}: {error}") from None
+    return rows
+
+
+def _parameter(query, name, kind, default=_REQUIRED):
+    if name not in query:
+        if default is _REQUIRED:
+            raise ValueError(f"Missing parameter: {name}")
+        return default
+    try:
+        return kind(query[name][-1])
+    except ValueError:
+        raise ValueError(f"Invalid parameter {name}: {query[name][-1]}") from None
+
+
+def _export_format(query):
+    file_format = _parameter(query, "format", str, "csv")
+    if file_format not in export.available_formats():
+        raise ValueError(f"Unknown export format {file_format}, use one of {', '.join(export.available_formats())}")
+    return file_format
+
+
+def _age_and_capital(age, capital):
+    """
+    JSON payload of a retirement age and capital.
+
+    Raises:
+        ValueError: if the capital is not finite
+    """
+    if age == NO_RETIREMENT or age is None:
+        return {"retirement_age": None, "capital_after_retirement": None}
+    if not math.isfinite(capital):
+        raise ValueError(OVERFLOW_ERROR)
+    return {"retirement_age": age, "capital_after_retirement": capital}
+
+
+def _details(inputs):
+    result = plan_retirement(*inputs)
+    payload = _age_and_capital(result.retirement_age, result.capital_after_retirement)
+    timeline = result.timeline
+    if timeline is not None and not (
+        np.isfinite(timeline.capital).all() and np.isfinite(timeline.monthly_cost).all()
+    ):
+        raise ValueError(OVERFLOW_ERROR)
+    payload["chart"] = [list(point) for point in result.chart or []]
+    payload["timeline"] = None if timeline is None else {
+        "age": timeline.age.tolist(),
+        "capital": timeline.capital.tolist(),
+        "monthly_cost": timeline.monthly_cost.tolist(),
+        "retirement_index": timeline.retirement_index,
+    }
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON HTTP API of the retirement calculator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cache-size", type=int, default=4096, help="cached results")
+    parser.add_argument("--batch-size", type=int, default=256, help="largest micro-batch")
+    parser.add_argument("--batch-wait-ms", type=float, default=2.0,
+                        help="longest wait for a micro-batch to fill")
+    parser.add_argument("--lookup-grid", default=os.environ.get("EMERYTURA_LOOKUP_GRID"),
+                        help="grid .npy file built by lookup_grid.py, answers /retirement without details")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    server = RetirementServer(
+        (args.host, args.port),
+        cache_size=args.cache_size,
+        batch_size=args.batch_size,
+        batch_wait=args.batch_wait_ms / 1000,
+        verbose=args.verbose,
+        lookup_grid=args.lookup_grid,
+    )
+    print(f"Listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import numpy as np
+
+from retirement_calc import (
+    _batch_discounted_flows,
+    _closed_form_applicable,
+    _discounted_flows,
+    _loop_final_capital,
+    _monthly_discounted_flows,
+    _monthly_rates,
+    _resolve_engine,
+)
+
+# Inputs of calculate_retirement_age that solve can find for a target age
+QUANTITIES = ("monthly_contribution", "starting_capital", "retirement_value")
+
+# Largest amount tried while bracketing a root
+_SEARCH_LIMIT = 1e15
+
+
+def solve(
+    quantity,
+    target_age,
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+    engine=None,
+):
+    """
+    Finds the input that makes retiring at target_age just possible: the
+    minimum monthly_contribution, the minimum starting_capital or the
+    maximum monthly retirement_value.
+
+    With the closed-form engine the break-even value follows from the same
+    annuity factors as calculate_retirement_age: retiring after n years
+    leaves capital at death when
+    starting_capital + (contribution + withdrawal) * flows(n) > withdrawal * flows(years),
+    which is linear in each of the three quantities, and the monthly engine
+    only changes the flows. Other inputs, and the loop engine, bracket the break-even value and bisect on the simulated
+    final capital.
+
+    Args:
+        quantity: one of QUANTITIES, its value among the inputs is ignored
+        target_age: desired retirement age
+        current_age, ..., starting_capital: same as calculate_retirement_age
+        engine: one of ENGINES, defaults to DEFAULT_ENGINE
+
+    Returns:
+        break-even value of quantity: any larger contribution or capital, or
+        any smaller retirement value, retires at target_age. 0 if it is not
+        needed, None if target_age cannot be reached at all
+    """
+    engine = _resolve_engine(engine)
+    _check_quantity(quantity)
+    if not current_age <= target_age < death_age:
+        return None
+
+    inputs = {
+        "current_age": current_age,
+        "monthly_contribution": monthly_contribution,
+        "annual_investment_return": annual_investment_return,
+        "death_age": death_age,
+        "inflation": inflation,
+        "retirement_value": retirement_value,
+        "starting_capital": starting_capital,
+    }
+    # The solved retirement value is non-negative, which the closed form needs
+    inputs[quantity] = 0
+    if engine == "closed_form" and _closed_form_applicable(**inputs):
+        growth = 1 + annual_investment_return / 100
+        indexation = 1 + inflation / 100
+        accumulation = _discounted_flows(growth, indexation, target_age - current_age)
+        total = _discounted_flows(growth, indexation, death_age - current_age)
+        value = _closed_form_solution(quantity, accumulation, total, **inputs)
+        return None if np.isnan(value) else float(value)
+    if engine == "monthly" and _closed_form_applicable(**inputs):
+        growth, indexation = _monthly_rates(annual_investment_return, inflation)
+        flows, _, _ = _monthly_discounted_flows(growth, indexation, (death_age - current_age) * 12)
+        # Monthly flows in units of the yearly amounts _closed_form_solution expects
+        accumulation = flows[(target_age - current_age) * 12] / 12
+        total = flows[-1] / 12
+        value = _closed_form_solution(quantity, accumulation, total, **inputs)
+        return None if np.isnan(value) else float(value)
+    return _bracketed_solution(quantity, target_age, inputs)
+
+
+def solve_batch(
+    quantity,
+    target_age,
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+):
+    """
+    solve for many profiles at once, e.g. a whole client list, with the
+    yearly closed-form model.
+
+    Profiles the closed form covers are solved together with NumPy, the rest
+    are handed to solve one by one.
+
+    Args:
+        quantity: one of QUANTITIES
+        target_age, current_age, ..., starting_capital: equal-length arrays,
+            one element per profile. The array of quantity is ignored and may
+            be None
+
+    Returns:
+        float array of break-even values, NaN where target_age cannot be reached
+    """
+    _check_quantity(quantity)
+    target_age = np.asarray(target_age, dtype=np.int64)
+    profiles = len(target_age)
+    inputs = {
+        "current_age": current_age,
+        "monthly_contribution": monthly_contribution,
+        "annual_investment_return": annual_investment_return,
+        "death_age": death_age,
+        "inflation": inflation,
+        "retirement_value": retirement_value,
+        "starting_capital": starting_capital,
+    }
+    inputs[quantity] = np.zeros(profiles)
+    for name, values in inputs.items():
+        inputs[name] = np.asarray(values, dtype=np.int64 if name.endswith("_age") else float)
+        if inputs[name].shape != (profiles,):
+            raise ValueError("All inputs must be one-dimensional arrays of equal length")
+
+    growth = 1 + inputs["annual_investment_return"] / 100
+    indexation = 1 + inputs["inflation"] / 100
+    accumulation = _batch_discounted_flows(growth, indexation, target_age - inputs["current_age"])
+    total = _batch_discounted_flows(growth, indexation, inputs["death_age"] - inputs["current_age"])
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        solution = _closed_form_solution(quantity, accumulation, total, **inputs)
+
+    reachable = (inputs["current_age"] <= target_age) & (target_age < inputs["death_age"])
+    solution = np.where(reachable, solution, np.nan)
+
+    # Inputs the closed form does not cover, e.g. a return of -100%
+    (unsupported,) = np.nonzero(
+        reachable
+        & ((inputs["annual_investment_return"] <= -100) | (inputs["inflation"] <= -100)
+           | (inputs["retirement_value"] < 0))
+    )
+    for index in unsupported:
+        profile = {name: values[index].item() for name, values in inputs.items()}
+        value = solve(quantity, int(target_age[index]), **profile, engine="loop")
+        solution[index] = np.nan if value is None else value
+    return solution
+
+
+def _check_quantity(quantity):
+    if quantity not in QUANTITIES:
+        raise ValueError(f"Unknown quantity {quantity!r}, expected one of {QUANTITIES}")
+
+
+def _closed_form_solution(
+    quantity,
+    accumulation,
+    total,
+    current_age,
+    monthly_contribution,
+    annual_investment_return,
+    death_age,
+    inflation,
+    retirement_value,
+    starting_capital,
+):
+    """
+    Break-even value of quantity from the annuity factors of the
+    accumulation years and of all years until death. Works on scalars and
+    arrays alike, NaN where no value of quantity is enough.
+    """
+    contribution = monthly_contribution * 12
+    withdrawal = retirement_value * 12
+
+    if quantity == "starting_capital":
+        value = withdrawal * total - (contribution + withdrawal) * accumulation
+    elif quantity == "monthly_contribution":
+        # Retiring right away leaves no years for contributions
+        needed = withdrawal * total - starting_capital - withdrawal * accumulation
+        value = np.where(
+            accumulation > 0,
+            needed / np.where(accumulation > 0, accumulation, 1) / 12,
+            np.where(needed < 0, 0.0, np.nan),
+        )
+    else:
+        available = starting_capital + contribution * accumulation
+        # Nothing to withdraw from if even zero spending leaves no capital
+        value = np.where(available > 0, available / (total - accumulation) / 12, np.nan)
+    return np.maximum(value, 0.0)
+
+
+def _bracketed_solution(quantity, target_age, inputs):
+    """
+    Bisection on the loop engine's final capital at target_age. The capital
+    grows with the contribution and the starting capital and shrinks with
+    the retirement value.
+    """
+
+    def feasible(value):
+        profile = dict(inputs, **{quantity: value})
+        return _loop_final_capital(*profile.values(), target_age) > 0
+
+    increasing = quantity != "retirement_value"
+    if feasible(0) == increasing:
+        # Zero already works (minimum) or already fails (maximum)
+        return 0.0 if increasing else None
+
+    # Grow the bracket until it contains the break-even value
+    low, high = 0.0, 1.0
+    while feasible(high) != increasing:
+        low, high = high, high * 2
+        if high > _SEARCH_LIMIT:
+            return None
+
+    while high - low > 1e-9 * max(high, 1.0):
+        middle = (low + high) / 2
+        if feasible(middle) != increasing:
+            low = middle
+        else:
+            high = middle
+    return high if increasing else low
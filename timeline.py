@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+# Phase names used by the legacy list-of-dicts timelines
+PHASES = ("Accumulation", "Retirement")
+
+
+class Timeline:
+    """
+    Yearly capital and monthly cost of a single retirement plan, stored as
+    columns instead of one dict per year.
+
+    Rows before retirement_index belong to the accumulation phase, the rest
+    to the retirement phase.
+    """
+
+    __slots__ = ("age", "_values", "retirement_index")
+
+    def __init__(self, age, capital, monthly_cost, retirement_index):
+        self.age = np.ascontiguousarray(age, dtype=np.int16)
+        # One contiguous block, capital in row 0 and monthly cost in row 1
+        self._values = np.empty((2, len(self.age)))
+        self._values[0] = capital
+        self._values[1] = monthly_cost
+        self.retirement_index = int(retirement_index)
+
+    @property
+    def capital(self):
+        return self._values[0]
+
+    @property
+    def monthly_cost(self):
+        return self._values[1]
+
+    @property
+    def accumulation(self):
+        """
+        Slice of the rows of the accumulation phase, indexing a column with it
+        gives a view.
+        """
+        return slice(0, self.retirement_index)
+
+    @property
+    def retirement(self):
+        """
+        Slice of the rows of the retirement phase.
+        """
+        return slice(self.retirement_index, len(self.age))
+
+    def __len__(self):
+        return len(self.age)
+
+    @property
+    def nbytes(self):
+        return self.age.nbytes + self._values.nbytes
+
+    def phases(self):
+        """
+        Phase of every row as a two-category pd.Categorical.
+        """
+        codes = (np.arange(len(self)) >= self.retirement_index).astype(np.int8)
+        return pd.Categorical.from_codes(codes, categories=PHASES)
+
+    def to_numpy(self):
+        """
+        View of shape (years, 2) with the capital and monthly cost columns.
+        """
+        return self._values.T
+
+    def to_pandas(self):
+        """
+        DataFrame indexed by age with capital and monthly_cost columns,
+        sharing memory with the timeline.
+        """
+        return pd.DataFrame(
+            self._values.T,
+            index=pd.Index(self.age, name='age', copy=False),
+            columns=['capital', 'monthly_cost'],
+            copy=False,
+        )
+
+    def to_records(self):
+        """
+        Returns the legacy (capital_timeline, cost_timeline) lists of dicts.
+        """
+        ages = self.age.tolist()
+        phases = [PHASES[row >= self.retirement_index] for row in range(len(ages))]
+        capital_timeline = [
+            {'age': age, 'capital': capital, 'phase': phase}
+            for age, capital, phase in zip(ages, self.capital.tolist(), phases)
+        ]
+        cost_timeline = [
+            {'age': age, 'monthly_cost': cost, 'phase': phase}
+            for age, cost, phase in zip(ages, self.monthly_cost.tolist(), phases)
+        ]
+        return capital_timeline, cost_timeline